@@ -1,15 +1,13 @@
 import csv
-from PIL import Image
 import pandas as pd
-import geopandas as gpd
+from world_assets import load_world_assets
+from df_index import types_at
+from path_grid import LAYERS
+from climate_map import color_to_climate
+from world_spec import DEFAULT_WORLD_SPEC, check_grid_shape, load_world_spec
 
-def read_bytes_file(filename):
-    with open(filename, 'rb') as file:
-        return file.read()
-
-def get_byte_at_position(data, x, y, width):
-    index = x + (y * width)
-    return data[index]
+def get_byte_at_position(data, x, y):
+    return int(data[y, x])
 
 def interpret_byte(byte_value):
     paths = {'N': False, 'NE': False, 'E': False, 'SE': False, 
@@ -54,28 +52,24 @@ def interpret_byte_to_string(byte_value):
     paths = interpret_byte(byte_value)
     return '|'.join([direction for direction, available in paths.items() if available])
 
-def check_road_coordinate(x, y, road_data, width):
-    road_byte = get_byte_at_position(road_data, x, y, width)
+def check_road_coordinate(x, y, road_data):
+    road_byte = get_byte_at_position(road_data, x, y)
     return interpret_byte_to_string(road_byte)  # Use the updated function for pipe-separated values
 
-def check_track_coordinate(x, y, track_data, width):
-    track_byte = get_byte_at_position(track_data, x, y, width)
+def check_track_coordinate(x, y, track_data):
+    track_byte = get_byte_at_position(track_data, x, y)
     return interpret_byte_to_string(track_byte)  # Reuse interpret_byte_to_string for tracks
 
-def interpret_terrain(terrainX, terrainY, roads_vector):
+def interpret_terrain(terrainX, terrainY, roads_vector, spec=DEFAULT_WORLD_SPEC):
     """
     Compares terrainX, terrainY with the lookup table and roads_vector to find a match.
     For (64, 64) locations, copies roads_vector into roads.
     """
-    # Lookup table for terrain values
-    terrain_lookup = {
-        (21, 107): 'NW', (64, 107): 'N', (107, 107): 'NE',
-        (21, 64): 'W',  (107, 64): 'E',
-        (21, 21): 'SW', (64, 21): 'S', (107, 21): 'SE'
-    }
+    # Lookup table for terrain values, e.g. (21, 107): 'NW', (64, 107): 'N' with 3x3 sub-cells
+    terrain_lookup = spec['subcell_directions']
     
-    # Special case for (64, 64)
-    if terrainX == 64 and terrainY == 64:
+    # Special case for the center sub-cell (64, 64)
+    if terrainX == spec['tile_center'] and terrainY == spec['tile_center']:
         return roads_vector  # Copy roads_vector into roads
     
     # Check for other matches in the lookup table
@@ -86,46 +80,14 @@ def interpret_terrain(terrainX, terrainY, roads_vector):
                 return direction
     return ''
 
-def read_df_location_csv(filename):
-    """
-    Reads the DFLocations.csv and returns two dictionaries:
-    one with (worldX, worldY) as keys and locationtype as values,
-    and another with (worldX, worldY) as keys and dungeontype as values.
-    """
-    df_locationtype_map = {}
-    df_dungeontype_map = {}
-    with open(filename, newline='') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            key = (int(row['worldX']), int(row['worldY']))
-            df_locationtype_map[key] = row['locationtype']
-            df_dungeontype_map[key] = row['dungeontype']
-    return df_locationtype_map, df_dungeontype_map
-
-# Dictionary to map colors to climate types
-color_to_climate = {
-    (0, 32, 192): 'ocean',
-    (0, 190, 0): 'woodland',
-    (191, 143, 191): 'woodlandHills',
-    (190, 166, 143): 'hauntedWoodland',
-    (230, 196, 230): 'mountain',
-    (216, 154, 62): 'hammerfellMountain',
-    (0, 152, 25): 'rainforest',
-    (115, 153, 141): 'swamp',
-    (180, 180, 180): 'subtropical',
-    (217, 217, 217): 'desert',
-    (255, 255, 255): 'desert2'
-}
-
 def get_climate_from_image(image, x, y):
-    """Get the climate type based on the pixel color at (x, y) in the image."""
-    r, g, b = image.getpixel((x, y))[:3]  # Ignore the alpha channel
+    """Get the climate type based on the pixel color at (x, y) in the image array."""
+    r, g, b = (int(c) for c in image[y, x, :3])  # Ignore the alpha channel
     return color_to_climate.get((r, g, b), 'unknown')  # Return 'unknown' if color does not match
 
 # Now let's define the function to add the region using geopandas
-def add_region(csv_filename, gpkg_filename):
-    # Read the geopackage file with regions
-    regions_gdf = gpd.read_file(gpkg_filename)
+def add_region(csv_filename, regions_gdf):
+    import geopandas as gpd  # Deferred so the module can be imported without loading geopandas
 
     # Read the locations csv file into a pandas DataFrame
     locations_df = pd.read_csv(csv_filename)
@@ -159,34 +121,44 @@ def determine_wilderness_level(row):
     return 2
 
 # Main function that processes all the data and updates the CSV
-def update_csv_with_all_data(csv_filename, road_data_filename, track_data_filename, df_location_filename, climate_image_filename, gpkg_filename):
-    road_data = read_bytes_file(road_data_filename)
-    track_data = read_bytes_file(track_data_filename)
-    df_locationtype_map, df_dungeontype_map = read_df_location_csv(df_location_filename)
+def update_csv_with_all_data(csv_filename, path_grid_filename, df_location_filename, climate_image_filename, gpkg_filename,
+                             spec=None):
+    spec = spec or load_world_spec()
+    # Load all world inputs concurrently; rasters come back as read-only arrays indexed [y, x]
+    assets = load_world_assets(['paths', 'dflocations', 'climate', 'regions'], {
+        'paths': path_grid_filename,
+        'dflocations': df_location_filename,
+        'climate': climate_image_filename,
+        'regions': gpkg_filename,
+    }, spec=spec)
+    check_grid_shape(spec, assets['paths'].shape, "The path grid")
+    road_data = assets['paths'][..., LAYERS.index('road')]
+    track_data = assets['paths'][..., LAYERS.index('track')]
+    climate_img = assets['climate']
     locations = read_csv_file(csv_filename)
-    width = 1000  # Width of the map, assuming it's the same for both roads and tracks
-
-    # Load the climate image and process each location
-    with Image.open(climate_image_filename) as climate_img:
-        for location in locations:
-            x = int(location['worldX'])
-            y = int(location['worldY'])
-
-            # Assigning roads, tracks, location type, and climate
-            location['roads_vector'] = check_road_coordinate(x, y, road_data, width)
-            location['roads'] = interpret_terrain(int(location['terrainX']), int(location['terrainY']), location['roads_vector'])
-            location['tracks_vector'] = check_track_coordinate(x, y, track_data, width)
-            location['tracks'] = interpret_terrain(int(location['terrainX']), int(location['terrainY']), location['tracks_vector'])
-            location['df_locationtype'] = df_locationtype_map.get((x, y), '')
-            location['df_dungeontype'] = df_dungeontype_map.get((x, y), '')  # New field for dungeon type
-            location['climate'] = get_climate_from_image(climate_img, x, y)
+
+    # Gather the DF location and dungeon types for every location at once from the compiled index
+    xs = [int(location['worldX']) for location in locations]
+    ys = [int(location['worldY']) for location in locations]
+    df_locationtypes, df_dungeontypes = types_at(assets['dflocations'], xs, ys)
+
+    # Process each location
+    for location, x, y, df_locationtype, df_dungeontype in zip(locations, xs, ys, df_locationtypes, df_dungeontypes):
+        # Assigning roads, tracks, location type, and climate
+        location['roads_vector'] = check_road_coordinate(x, y, road_data)
+        location['roads'] = interpret_terrain(int(location['terrainX']), int(location['terrainY']), location['roads_vector'], spec)
+        location['tracks_vector'] = check_track_coordinate(x, y, track_data)
+        location['tracks'] = interpret_terrain(int(location['terrainX']), int(location['terrainY']), location['tracks_vector'], spec)
+        location['df_locationtype'] = str(df_locationtype)
+        location['df_dungeontype'] = str(df_dungeontype)  # New field for dungeon type
+        location['climate'] = get_climate_from_image(climate_img, x, y)
 
     # Convert updated location data to DataFrame for further processing
     locations_df = pd.DataFrame(locations)
 
     
     # Add region using the add_region function
-    locations_with_region_df = add_region(csv_filename, gpkg_filename)
+    locations_with_region_df = add_region(csv_filename, assets['regions'])
 
     # Ensure 'worldX' and 'worldY' are integers in both dataframes
     locations_df['worldX'] = locations_df['worldX'].astype(int)
@@ -209,12 +181,11 @@ def update_csv_with_all_data(csv_filename, road_data_filename, track_data_filena
     # Write the final updated data to CSV
     write_csv_file('updated_' + csv_filename, fieldnames, locations_df.to_dict('records'))
 
-# Example usage:
-update_csv_with_all_data(
-    'locations.csv',
-    'roadData.bytes',
-    'trackData.bytes',
-    'DFLocations.csv',
-    'DFClimateMap.png',
-    'Regions.gpkg'
-)
+if __name__ == "__main__":
+    update_csv_with_all_data(
+        'locations.csv',
+        'paths.grid',
+        'DFLocations.csv',
+        'DFClimateMap.png',
+        'Regions.gpkg'
+    )
@@ -1,7 +1,11 @@
 import pandas as pd
 import numpy as np
 
-def update_locations_with_lookup(populated_locations_path, location_names_path, output_path):
+def update_locations_with_lookup(populated_locations_path, location_names_path, output_path, prefab_dir=None):
+    """
+    Pass prefab_dir to take sizeX/sizeY straight from the prefab catalog
+    (see prefab_catalog.py) instead of the sizes listed in location_names.csv.
+    """
     # Load the data
     populated_locations = pd.read_csv(populated_locations_path)
     location_names = pd.read_csv(location_names_path)
@@ -20,16 +24,24 @@ def update_locations_with_lookup(populated_locations_path, location_names_path,
             populated_locations.at[index, 'sizeY'] = chosen_entry['sizeY']
         else:
             print(f"No prefab found for name: {row['name']}")
+
+    if prefab_dir:
+        from prefab_catalog import load_prefab_catalog, prefab_sizes
+        sizeX, sizeY = prefab_sizes(load_prefab_catalog(prefab_dir), populated_locations['prefab'].astype(str))
+        # Keep the location_names.csv sizes for prefabs the catalog doesn't know
+        populated_locations['sizeX'] = np.where(np.isnan(sizeX), populated_locations['sizeX'], sizeX)
+        populated_locations['sizeY'] = np.where(np.isnan(sizeY), populated_locations['sizeY'], sizeY)
     
     # Save the updated dataframe to a new CSV
     populated_locations.to_csv(output_path, index=False)
     print(f"Updated populated locations saved to {output_path}")
 
-# Paths for the files (update these as necessary)
-populated_locations_path = 'populated_locations.csv'
-location_names_path = 'location_names.csv'
-output_path = 'updated_populated_locations.csv'
+if __name__ == "__main__":
+    # Paths for the files (update these as necessary)
+    populated_locations_path = 'populated_locations.csv'
+    location_names_path = 'location_names.csv'
+    output_path = 'updated_populated_locations.csv'
 
-# Run the function
-update_locations_with_lookup(populated_locations_path, location_names_path, output_path)
+    # Run the function
+    update_locations_with_lookup(populated_locations_path, location_names_path, output_path)
 
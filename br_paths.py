@@ -38,12 +38,13 @@ def check_coordinate(x, y, road_data, track_data, width):
 
     return {'roads': road_paths, 'tracks': track_paths}
 
-# Example usage
-road_data = read_bytes_file('roadData.bytes')
-track_data = read_bytes_file('trackData.bytes')
-x, y = 665, 392  # Example coordinates
-width = 1000  # Width of the Daggerfall map
-
-paths = check_coordinate(x, y, road_data, track_data, width)
-print(paths)
+if __name__ == "__main__":
+    # Example usage
+    road_data = read_bytes_file('roadData.bytes')
+    track_data = read_bytes_file('trackData.bytes')
+    x, y = 665, 392  # Example coordinates
+    width = 1000  # Width of the Daggerfall map
+
+    paths = check_coordinate(x, y, road_data, track_data, width)
+    print(paths)
 
@@ -0,0 +1,32 @@
+"""
+Climate of every map pixel, decoded from the colours of DFClimateMap.png.
+
+The colour table is shared by add-loc-data.py (one climate per location), the
+query server and the generation sweep (a code grid for the whole map).
+"""
+import numpy as np
+
+# Dictionary to map colors to climate types
+color_to_climate = {
+    (0, 32, 192): 'ocean',
+    (0, 190, 0): 'woodland',
+    (191, 143, 191): 'woodlandHills',
+    (190, 166, 143): 'hauntedWoodland',
+    (230, 196, 230): 'mountain',
+    (216, 154, 62): 'hammerfellMountain',
+    (0, 152, 25): 'rainforest',
+    (115, 153, 141): 'swamp',
+    (180, 180, 180): 'subtropical',
+    (217, 217, 217): 'desert',
+    (255, 255, 255): 'desert2'
+}
+
+def climate_codes(climate_image):
+    """(height, width) climate code grid and the climate names, decoded from the map colours once."""
+    rgb = climate_image[..., :3].astype(np.int64)
+    keys = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+    colors, inverse = np.unique(keys, return_inverse=True)
+    names = sorted(set(color_to_climate.values())) + ['unknown']
+    lookup = np.array([names.index(color_to_climate.get((c >> 16, (c >> 8) & 0xFF, c & 0xFF), 'unknown'))
+                       for c in colors], dtype=np.uint8)
+    return lookup[inverse.reshape(keys.shape)], np.array(names)
@@ -0,0 +1,104 @@
+"""
+Pre-indexed DFLocations lookup grid shared by all stages.
+
+DFLocations.csv is compiled once into dense (height, width) arrays holding the
+number of DF locations, the location type code and the dungeon type code of
+every map pixel, so exclusion checks and type lookups become array gathers.
+The dense arrays keep the last location listed for a pixel (as the old dict
+lookups did); pixels holding several DF locations also get every location
+recorded in an overflow table, sorted by pixel.
+
+The compiled index is cached next to the CSV (see npz_cache.py).
+"""
+import os
+import numpy as np
+from npz_cache import load_cached_npz
+
+def index_cache_filename(csv_filename):
+    return os.path.splitext(csv_filename)[0] + '.index.npz'
+
+def encode_names(values):
+    """Return (names, codes) where names[0] is '' and names[codes] == values."""
+    names, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    if len(names) == 0 or names[0] != '':
+        names = np.concatenate([[''], names])
+        codes = codes + 1
+    return names, codes.astype(np.uint8)
+
+def build_dflocation_index(csv_filename, width=1000, height=500):
+    """Compile DFLocations.csv into dense per-pixel arrays plus an overflow table."""
+    import pandas as pd
+    df = pd.read_csv(csv_filename, keep_default_na=False,
+                     usecols=['worldX', 'worldY', 'locationtype', 'dungeontype'])
+    pixel = df['worldY'].to_numpy(dtype=np.int64) * width + df['worldX'].to_numpy(dtype=np.int64)
+    locationtype_names, locationtype_codes = encode_names(df['locationtype'])
+    dungeontype_names, dungeontype_codes = encode_names(df['dungeontype'])
+
+    count = np.bincount(pixel, minlength=width * height).astype(np.uint8)
+    # Fancy assignment keeps the last value written for repeated pixels, matching the CSV order
+    locationtype = np.zeros(width * height, dtype=np.uint8)
+    dungeontype = np.zeros(width * height, dtype=np.uint8)
+    locationtype[pixel] = locationtype_codes
+    dungeontype[pixel] = dungeontype_codes
+
+    # Every location on a pixel shared with another one goes into the overflow table
+    shared = count[pixel] > 1
+    order = np.argsort(pixel[shared], kind='stable')
+
+    return {
+        'width': np.array(width),
+        'height': np.array(height),
+        'count': count.reshape(height, width),
+        'locationtype': locationtype.reshape(height, width),
+        'dungeontype': dungeontype.reshape(height, width),
+        'locationtype_names': locationtype_names,
+        'dungeontype_names': dungeontype_names,
+        'overflow_pixel': pixel[shared][order],
+        'overflow_locationtype': locationtype_codes[shared][order],
+        'overflow_dungeontype': dungeontype_codes[shared][order],
+    }
+
+def load_dflocation_index(csv_filename, width=1000, height=500, cache_filename=None):
+    """The compiled DFLocations index of csv_filename, from its cache while the CSV is unchanged."""
+    return load_cached_npz(csv_filename, cache_filename or index_cache_filename(csv_filename),
+                           lambda: build_dflocation_index(csv_filename, width, height),
+                           lambda index: index['width'] == width and index['height'] == height,
+                           "DFLocations index")
+
+def pixels_with_types(index, locationtypes):
+    """Boolean (height, width) mask of pixels holding any DF location of the given types."""
+    codes = np.flatnonzero(np.isin(index['locationtype_names'], list(locationtypes)))
+    mask = np.isin(index['locationtype'], codes)
+    # Types hidden behind another location on the same pixel come from the overflow table
+    overflow = index['overflow_pixel'][np.isin(index['overflow_locationtype'], codes)]
+    mask.reshape(-1)[overflow] = True
+    return mask
+
+def types_at(index, xs, ys):
+    """Gather the (locationtype, dungeontype) names of the DF location at each (x, y)."""
+    locationtype = index['locationtype_names'][index['locationtype'][ys, xs]]
+    dungeontype = index['dungeontype_names'][index['dungeontype'][ys, xs]]
+    return locationtype, dungeontype
+
+def locations_at(index, x, y):
+    """List (locationtype, dungeontype) for every DF location at map pixel (x, y)."""
+    return locations_at_pixels(index, np.array([x]), np.array([y]))[0]
+
+def locations_at_pixels(index, xs, ys):
+    """locations_at for every (x, y) at once, as one list per pixel."""
+    xs, ys = np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)
+    count = index['count'][ys, xs].tolist()
+    locationtype, dungeontype = types_at(index, xs, ys)
+    # Pixels with several locations list all of them from the overflow table
+    pixel = ys * int(index['width']) + xs
+    starts = np.searchsorted(index['overflow_pixel'], pixel).tolist()
+    stops = np.searchsorted(index['overflow_pixel'], pixel, side='right').tolist()
+    found = []
+    for i, n in enumerate(count):
+        if n > 1:
+            rows = slice(starts[i], stops[i])
+            found.append(list(zip(index['locationtype_names'][index['overflow_locationtype'][rows]].tolist(),
+                                  index['dungeontype_names'][index['overflow_dungeontype'][rows]].tolist())))
+        else:
+            found.append([(str(locationtype[i]), str(dungeontype[i]))] if n else [])
+    return found
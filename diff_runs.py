@@ -0,0 +1,103 @@
+"""
+Compare two generation runs.
+
+Both outputs are joined on locationID with one hash join (pandas merge), and
+every location is classified as added, removed, renamed (different location
+name), reprefabbed (same name, different prefab), moved (same name and prefab,
+different position) or unchanged. Counts per region and per location name are
+compared as well, and the changed map pixels can be rendered as an image:
+green for added, red for removed, yellow for changed locations.
+"""
+import numpy as np
+import pandas as pd
+from path_geometry import TERRAIN_SIZE
+
+KEY = 'locationID'
+POSITION_COLUMNS = ['worldX', 'worldY', 'terrainX', 'terrainY']
+COMPARED_COLUMNS = ['name', 'prefab', 'region'] + POSITION_COLUMNS
+STATUSES = ['added', 'removed', 'renamed', 'reprefabbed', 'moved', 'unchanged']
+STATUS_COLORS = {
+    'added': (0, 200, 0),
+    'removed': (220, 0, 0),
+    'changed': (230, 200, 0),
+}
+
+def read_run(csv_filename):
+    """The columns of an output the diff uses, one row per locationID."""
+    df = pd.read_csv(csv_filename, usecols=lambda column: column in [KEY] + COMPARED_COLUMNS)
+    for column in COMPARED_COLUMNS:
+        if column not in df.columns:
+            df[column] = np.nan
+    duplicated = df[KEY].duplicated()
+    if duplicated.any():
+        print(f"{csv_filename}: {duplicated.sum()} duplicate locationIDs, keeping the first of each")
+        df = df[~duplicated]
+    return df
+
+def same(old, new):
+    """Element-wise equality that treats two missing values as equal."""
+    return (old == new) | (old.isna() & new.isna())
+
+def diff_runs(old_csv, new_csv):
+    """Join two outputs on locationID and classify every location."""
+    merged = read_run(old_csv).merge(read_run(new_csv), on=KEY, how='outer', suffixes=('_old', '_new'),
+                                     indicator=True)
+    status = np.select(
+        [merged['_merge'] == 'right_only',
+         merged['_merge'] == 'left_only',
+         ~same(merged['name_old'], merged['name_new']),
+         ~same(merged['prefab_old'], merged['prefab_new']),
+         ~np.logical_and.reduce([same(merged[c + '_old'], merged[c + '_new']) for c in POSITION_COLUMNS])],
+        STATUSES[:-1], default='unchanged')
+    merged['status'] = pd.Categorical(status, categories=STATUSES)
+    return merged.drop(columns='_merge')
+
+def count_deltas(merged, column):
+    """Old count, new count and change per value of `column` (region or name)."""
+    old = merged.loc[merged['status'] != 'added', column + '_old'].fillna('').value_counts()
+    new = merged.loc[merged['status'] != 'removed', column + '_new'].fillna('').value_counts()
+    counts = pd.DataFrame({'old': old, 'new': new}).fillna(0).astype(int)
+    counts['delta'] = counts['new'] - counts['old']
+    return counts[counts['delta'] != 0].sort_values('delta', key=abs, ascending=False)
+
+def movement(merged, terrain_size=TERRAIN_SIZE):
+    """Displacement (terrain units) of every moved location."""
+    moved = merged[merged['status'] == 'moved']
+    dx = (moved['worldX_new'] - moved['worldX_old']) * terrain_size + moved['terrainX_new'] - moved['terrainX_old']
+    # terrainY grows to the north, worldY to the south
+    dy = (moved['worldY_old'] - moved['worldY_new']) * terrain_size + moved['terrainY_new'] - moved['terrainY_old']
+    return np.hypot(dx, dy)
+
+def summarize(merged, top=10, terrain_size=TERRAIN_SIZE):
+    """Printable report of a diff; terrain_size is the world spec's terrain tile size."""
+    counts = merged['status'].value_counts().reindex(STATUSES, fill_value=0)
+    lines = [f"{status}: {count}" for status, count in counts.items()]
+    distance = movement(merged, terrain_size)
+    if len(distance):
+        lines.append(f"moved distance (terrain units): mean {distance.mean():.1f}, max {distance.max():.1f}")
+    renamed = merged[merged['status'] == 'renamed']
+    if len(renamed):
+        pairs = (renamed['name_old'].fillna('') + ' -> ' + renamed['name_new'].fillna('')).value_counts().head(top)
+        lines.append("most common renames:")
+        lines += [f"  {pair}: {count}" for pair, count in pairs.items()]
+    for column in ['region', 'name']:
+        deltas = count_deltas(merged, column)
+        if len(deltas):
+            lines.append(f"{column} count changes (old -> new):")
+            lines += [f"  {value or '(none)'}: {row.old} -> {row.new} ({row.delta:+d})"
+                      for value, row in deltas.head(top).iterrows()]
+    return '\n'.join(lines)
+
+def render_diff_image(merged, output_file, width=1000, height=500):
+    """Changed map pixels: green added, red removed, yellow changed; brighter for more changes."""
+    from PIL import Image
+    image = np.zeros((height, width, 3), dtype=np.float64)
+    for status, suffix, color in [('added', '_new', 'added'), ('removed', '_old', 'removed')] + \
+            [(s, '_new', 'changed') for s in ['renamed', 'reprefabbed', 'moved']]:
+        rows = merged[merged['status'] == status]
+        counts = np.zeros((height, width))
+        np.add.at(counts, (rows['worldY' + suffix].to_numpy(dtype=np.int64),
+                           rows['worldX' + suffix].to_numpy(dtype=np.int64)), 1)
+        # One change already shows at half brightness
+        image += np.minimum(1, 0.5 + counts / 4)[..., None] * (counts > 0)[..., None] * STATUS_COLORS[color]
+    Image.fromarray(np.clip(image, 0, 255).astype(np.uint8), 'RGB').save(output_file)
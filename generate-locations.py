@@ -1,12 +1,22 @@
 import csv
 import random
-from PIL import Image
+import numpy as np
+from world_assets import load_world_assets
+from df_index import pixels_with_types
+from path_geometry import DIRECTION_STEPS
+from path_grid import LAYERS
+from sparse_generation import build_generation_context, calculate_scaling_grid, sample_sparse_locations
+from water_checks import centers_in_water, crosses_water_paths, water_path_bits, water_path_footprint
+from world_spec import DEFAULT_WORLD_SPEC, check_grid_shape, load_world_spec
 
 # Example probability values, adjust them as needed
 wilderness_chance = 32
 track_chance = 9
 road_chance = 3
 
+# Prefab sizes the footprint tested against rivers and streams is taken from
+location_names_file = 'location_names.csv'
+
 # Define the baseline brightness of the color #848683 for comparison
 baseline_brightness = (132 + 134 + 131) / 3  # Brightness of the color #848683
 
@@ -22,13 +32,8 @@ def get_scaling_factor(worldX, worldY, image):
     scaling_factor = pixel_brightness / reference_brightness
     return scaling_factor
 
-def read_bytes_file(filename):
-    with open(filename, 'rb') as file:
-        return file.read()
-
-def get_byte_at_position(data, x, y, width):
-    index = x + (y * width)
-    return data[index]
+def get_byte_at_position(data, x, y):
+    return int(data[y, x])
 
 def interpret_byte(byte_value):
     paths = {'N': False, 'NE': False, 'E': False, 'SE': False, 
@@ -53,9 +58,9 @@ def interpret_byte(byte_value):
 
     return paths
 
-def check_coordinate(x, y, road_data, track_data, width):
-    road_byte = get_byte_at_position(road_data, x, y, width)
-    track_byte = get_byte_at_position(track_data, x, y, width)
+def check_coordinate(x, y, road_data, track_data):
+    road_byte = get_byte_at_position(road_data, x, y)
+    track_byte = get_byte_at_position(track_data, x, y)
 
     road_paths = interpret_byte(road_byte)
     track_paths = interpret_byte(track_byte)
@@ -64,87 +69,91 @@ def check_coordinate(x, y, road_data, track_data, width):
     has_any_path = any(combined_paths.values())
     return combined_paths, has_any_path
 
-def cell_center_from_direction(directions, has_any_path):
+def subcell_layout(spec):
+    """
+    Sub-cell centers of a world spec as plain tuples, computed once per run for
+    the dense loop: the center cell, every other cell, and the cells each
+    direction's path runs through from the center cell to the edge, e.g.
+    N -> (64, 107) and NE -> (107, 107) with 3x3 sub-cells in a 128x128 tile.
+    """
+    coords = spec['subcell_coords'].tolist()
+    center = spec['center_subcell']
+    return {
+        'center': (coords[center], coords[center]),
+        'others': [(tx, ty) for tx in coords for ty in coords if (tx, ty) != (coords[center], coords[center])],
+        'direction_cells': [[(coords[center + k * dx], coords[center + k * dy]) for k in range(1, center + 1)]
+                            for dx, dy in DIRECTION_STEPS.astype(int).tolist()],
+    }
+
+DEFAULT_SUBCELL_LAYOUT = subcell_layout(DEFAULT_WORLD_SPEC)
+
+def cell_center_from_direction(directions, has_any_path, layout=DEFAULT_SUBCELL_LAYOUT):
     centers = []
     if has_any_path:
         # Include the center cell if there's any road or track
-        centers.append((64, 64))
+        centers.append(layout['center'])
 
-    # Mapping additional directions to 3x3 cell centers within a 128x128 grid
-    direction_to_center = {
-        'N': (64, 107), 'NE': (107, 107), 'E': (107, 64), 'SE': (107, 21),
-        'S': (64, 21), 'SW': (21, 21), 'W': (21, 64), 'NW': (21, 107)
-    }
-
-    for direction, has_path in directions.items():
+    # Every sub-cell center the path runs through (see subcell_layout)
+    for has_path, cells in zip(directions.values(), layout['direction_cells']):
         if has_path:
-            centers.append(direction_to_center[direction])
-    # Filter out any coordinates that are not 21, 64, or 107
-    centers = [center for center in centers if center[0] in [21, 64, 107] and center[1] in [21, 64, 107]]
+            centers.extend(cells)
     return centers
 
-def calculate_gis_coordinates(worldX, worldY, terrainX, terrainY):
-    gisX = worldX + (terrainX / 128.0)
-    gisY = -(worldY) - (1 - terrainY / 128.0)
+def calculate_gis_coordinates(worldX, worldY, terrainX, terrainY, terrain_size=128):
+    gisX = worldX + (terrainX / float(terrain_size))
+    gisY = -(worldY) - (1 - terrainY / float(terrain_size))
     return gisX, gisY
 
-def load_exclusions_from_dflocations(dflocations_filename):
-    exclusions = set()
-    town_exclusions = set()
-    with open(dflocations_filename, mode='r') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            worldX = int(row['worldX'])
-            worldY = int(row['worldY'])
-            # Add to exclusions if there's already a central location
-            exclusions.add((worldX, worldY))
-            # Add to town exclusions if the location type is a town or hamlet
-            if row['locationtype'] in ['TownCity', 'TownHamlet']:
-                town_exclusions.add((worldX, worldY))
+def load_exclusions_from_dflocations(dflocations):
+    """
+    Build (height, width) exclusion masks from the compiled DFLocations index:
+    pixels that already have a central location, and pixels with a town or hamlet.
+    """
+    exclusions = dflocations['count'] > 0
+    town_exclusions = pixels_with_types(dflocations, ['TownCity', 'TownHamlet'])
     return exclusions, town_exclusions
 
-def is_center_water_pixel(cell_x, cell_y, water_map):
-    # The scaling factors are determined by the ratio of the water map size to the game map size (in cells)
-    scale_x = water_map.size[0] / 3000  # water map width / game map width in cells
-    scale_y = water_map.size[1] / 1500  # water map height / game map height in cells
-    
-    # Calculate the corresponding top-left pixel of the cell block on the water map
-    water_x = int(cell_x * scale_x)
-    water_y = int(cell_y * scale_y)
-    
-    # Determine the center of the cell block on the water map
-    center_x = water_x + int(scale_x / 2)
-    center_y = water_y + int(scale_y / 2)
-    
-    # Assuming the water is represented by black in RGBA
-    black_color = (0, 0, 0, 255)  
-    pixel_color = water_map.getpixel((center_x, center_y))
-    
-    return pixel_color == black_color
-
-def should_generate_location(chance, worldX, worldY, heatmap):
-    """Decides whether to generate a location based on modified chance influenced by heatmap brightness."""
-    baseline_brightness = (132 + 134 + 131) / 3  # Brightness of the color #848683
-    scaling_factor = calculate_scaling_factor(worldX, worldY, heatmap, baseline_brightness)
+def filter_candidates(xs, ys, terrainXs, terrainYs, water_map, town_exclusions, water_paths=None, footprint=None,
+                      spec=DEFAULT_WORLD_SPEC):
+    """
+    Bulk rejection of candidate centers: drops centers whose cell center is water,
+    centers on town pixels and, if river/stream bits are given, centers whose
+    footprint ((sizeX, sizeY) terrain units, see water_path_footprint) crosses a
+    river or stream segment. Returns a boolean keep mask.
+    """
+    # Skip if the center of the cell would be in water or if it's a town exclusion
+    keep = ~centers_in_water(xs, ys, terrainXs, terrainYs, water_map, spec) & ~town_exclusions[ys, xs]
+    if water_paths is not None:
+        keep &= ~crosses_water_paths(water_paths, xs, ys, terrainXs, terrainYs, footprint, spec)
+    return keep
+
+def should_generate_location(chance, scaling_factor):
+    """
+    Decides whether to generate a location based on modified chance influenced by heatmap brightness;
+    scaling_factor is the map pixel's value in calculate_scaling_grid (sparse_generation.py).
+    """
     adjusted_chance = max(1, int(chance * scaling_factor))  # Ensure the chance is at least 1
     return random.randint(1, adjusted_chance) == 1
 
-def calculate_scaling_factor(worldX, worldY, heatmap, baseline_brightness):
-    pixel = heatmap.getpixel((worldX, worldY))
-    pixel_brightness = sum(pixel[:3]) / 3  # Average of R, G, B values
-    
-    # Inverting the scaling effect with a simple approach and normalization
-    scaling_factor = baseline_brightness / max(pixel_brightness, 1)  # Avoid division by zero
-    
-    # Normalize or limit the scaling factor to prevent extreme values
-    scaling_factor = min(max(scaling_factor, 1.0), 4.0)  # Example bounds: 0.5 to 2
+def write_locations_csv(output_csv_filename, xs, ys, terrainXs, terrainYs, terrain_size=128):
+    with open(output_csv_filename, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['name', 'type', 'prefab', 'worldX', 'worldY', 'terrainX', 'terrainY', 'locationID', 'gisX', 'gisY'])
+
+        for x, y, terrainX, terrainY in zip(xs.tolist(), ys.tolist(), terrainXs.tolist(), terrainYs.tolist()):
+            # Calculate GIS coordinates
+            gisX, gisY = calculate_gis_coordinates(x, y, terrainX, terrainY, terrain_size)
 
-    return scaling_factor
+            # Generate locationID with leading zeros if necessary
+            locationID = f"{x:02}{terrainX:02}{y:02}{terrainY:02}"
 
-def generate_wilderness_centers(has_road, exclusions, x, y, map_pixel_has_df_location, heatmap):
+            # Write to CSV if the cell is not water
+            writer.writerow(['', '', '', x, y, terrainX, terrainY, locationID, gisX, gisY])
+
+def generate_wilderness_centers(has_road, exclusions, x, y, map_pixel_has_df_location, scaling_factor,
+                                layout=DEFAULT_SUBCELL_LAYOUT):
     """Generates wilderness center locations based on road presence and DFLocation exclusions, adjusted by heatmap."""
     centers = []
-    valid_terrain_coords = [21, 64, 107]  # The valid terrain coordinates within a map pixel
     global wilderness_chance, track_chance, road_chance  # Ensure these are defined at the script's start
 
     # Adjust chances based on heatmap
@@ -155,60 +164,120 @@ def generate_wilderness_centers(has_road, exclusions, x, y, map_pixel_has_df_loc
     else:
         chance = wilderness_chance
 
-    for terrainX in valid_terrain_coords:
-        for terrainY in valid_terrain_coords:
-            if (terrainX, terrainY) != (64, 64) and should_generate_location(chance, x, y, heatmap):
-                centers.append((terrainX, terrainY))
-                
+    # Every sub-cell except the center one (see subcell_layout)
+    for terrainX, terrainY in layout['others']:
+        if should_generate_location(chance, scaling_factor):
+            centers.append((terrainX, terrainY))
+
     return centers
     return centers
 
-def generate_csv_with_locations(road_data_filename, track_data_filename, dflocations_filename, water_map_filename, output_csv_filename, heatmap_filename):
-    road_data = read_bytes_file(road_data_filename)
-    track_data = read_bytes_file(track_data_filename)
-    exclusions, town_exclusions = load_exclusions_from_dflocations(dflocations_filename)
-    water_map = Image.open(water_map_filename)  # Open the detailed water map
-    heatmap = Image.open(heatmap_filename)  # Open the heatmap for scaling factors based on brightness
-    width, height = 1000, 500  # Width and height for the game map
-
-    with open(output_csv_filename, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(['name', 'type', 'prefab', 'worldX', 'worldY', 'terrainX', 'terrainY', 'locationID', 'gisX', 'gisY'])
+def generate_csv_with_locations(path_grid_filename, dflocations_filename, water_map_filename, output_csv_filename, heatmap_filename,
+                                avoid_water_paths=False, mode='dense', seed=None, spec=None,
+                                location_names_filename=location_names_file):
+    """
+    Set avoid_water_paths to also reject centers where the largest prefab in
+    location_names_filename would cross a river or stream. mode='sparse' draws the same distribution of locations
+    from the eligible sub-cells only (see sample_sparse_locations) instead of
+    rolling dice for every map pixel. `spec` is the world spec (see world_spec.py).
+    """
+    spec = spec or load_world_spec()
+    # Load all inputs concurrently; rasters come back as read-only arrays indexed [y, x]
+    assets = load_world_assets(['paths', 'dflocations', 'water', 'heatmap'], {
+        'paths': path_grid_filename,  # Road, track, river and stream layers
+        'dflocations': dflocations_filename,
+        'water': water_map_filename,  # The detailed water map
+        'heatmap': heatmap_filename,  # The heatmap for scaling factors based on brightness
+    }, spec=spec)
+    paths = assets['paths']
+    check_grid_shape(spec, paths.shape, "The path grid")
+    road_data = paths[..., LAYERS.index('road')]
+    track_data = paths[..., LAYERS.index('track')]
+    exclusions, town_exclusions = load_exclusions_from_dflocations(assets['dflocations'])
+    water_map = assets['water']
+    heatmap = assets['heatmap']
+    height, width = road_data.shape  # Height and width for the game map
+
+    # Rivers and streams share one combined bitmask; either layer is enough to reject a center
+    water_paths = footprint = None
+    if avoid_water_paths:
+        water_paths = water_path_bits(paths)
+        footprint = water_path_footprint(location_names_filename)
+
+    if mode == 'sparse':
+        context = build_generation_context(paths, exclusions, town_exclusions, water_map, heatmap, avoid_water_paths, spec,
+                                           footprint)
+        chances = {'road': road_chance, 'track': track_chance, 'wilderness': wilderness_chance}
+        xs, ys, terrainXs, terrainYs = sample_sparse_locations(context, chances, np.random.default_rng(seed))
+        write_locations_csv(output_csv_filename, xs, ys, terrainXs, terrainYs, spec['terrain_size'])
+        return
+
+    if seed is not None:
+        random.seed(seed)
+
+    # Sub-cell centers and per-pixel heatmap scaling, looked up once instead of per pixel
+    layout = subcell_layout(spec)
+    scaling = calculate_scaling_grid(heatmap).tolist()
+
+    # Candidate centers are collected first and filtered in bulk afterwards
+    candidates = []
+    for y in range(height):
+        scaling_row = scaling[y]
+        for x in range(width):
+            combined_paths, has_any_path = check_coordinate(x, y, road_data, track_data)
+            map_pixel_has_df_location = exclusions[y, x]
+            scaling_factor = scaling_row[x]
+            
+            # If the map pixel is listed in DFLocations.csv, all cells have a 1 in 6 chance of getting a location,
+            # except for the center cell (64, 64), which is handled within the generate_wilderness_centers function.
+            if map_pixel_has_df_location:
+                centers = generate_wilderness_centers(True, exclusions, x, y, True, scaling_factor, layout)
+            else:
+                road_centers = cell_center_from_direction(combined_paths, has_any_path, layout)
+                road_centers = [center for center in road_centers if should_generate_location(road_chance, scaling_factor)]
+                wilderness_centers = generate_wilderness_centers(has_any_path, exclusions, x, y, False, scaling_factor, layout)
+                centers = road_centers + wilderness_centers
+
+            candidates.extend((x, y, terrainX, terrainY) for terrainX, terrainY in centers)
+
+    xs, ys, terrainXs, terrainYs = np.array(candidates, dtype=np.int64).reshape(-1, 4).T
+    keep = filter_candidates(xs, ys, terrainXs, terrainYs, water_map, town_exclusions, water_paths, footprint, spec)
+
+    write_locations_csv(output_csv_filename, xs[keep], ys[keep], terrainXs[keep], terrainYs[keep], spec['terrain_size'])
+
+def sweep_chances(path_grid_filename, dflocations_filename, water_map_filename, heatmap_filename,
+                  climate_filename, regions_filename, settings, seeds, output_csv_filename,
+                  avoid_water_paths=False, seed=None, max_workers=None, spec=None,
+                  location_names_filename=location_names_file):
+    """
+    Sweep mode: run the sparse generator `seeds` times for every setting (see
+    location_sweep.sweep_settings) from one shared generation context, and write
+    the distribution of location counts in total, per region and per climate.
+    """
+    from location_sweep import sweep
+    from climate_map import climate_codes
+    spec = spec or load_world_spec()
+    assets = load_world_assets(['paths', 'dflocations', 'water', 'heatmap', 'climate', 'region_raster'], {
+        'paths': path_grid_filename,
+        'dflocations': dflocations_filename,
+        'water': water_map_filename,
+        'heatmap': heatmap_filename,
+        'climate': climate_filename,
+        'region_raster': regions_filename,
+    }, spec=spec)
+    exclusions, town_exclusions = load_exclusions_from_dflocations(assets['dflocations'])
+    footprint = water_path_footprint(location_names_filename) if avoid_water_paths else None
+    context = build_generation_context(assets['paths'], exclusions, town_exclusions, assets['water'], assets['heatmap'],
+                                       avoid_water_paths, spec, footprint)
+    climate, climate_names = climate_codes(assets['climate'])
+    regions = assets['region_raster']
+    stats = sweep(context, settings, seeds, regions['region'], regions['region_names'], climate, climate_names,
+                  seed, max_workers)
+    stats.to_csv(output_csv_filename, index=False)
+    return stats
+
+if __name__ == "__main__":
+    generate_csv_with_locations('paths.grid', 'DFLocations.csv', 'DFWaterMap.png', 'locations.csv', 'DFPopHeatMap.png')
 
-        for y in range(height):
-            for x in range(width):
-                combined_paths, has_any_path = check_coordinate(x, y, road_data, track_data, width)
-                map_pixel_has_df_location = (x, y) in exclusions
-                
-                # If the map pixel is listed in DFLocations.csv, all cells have a 1 in 6 chance of getting a location,
-                # except for the center cell (64, 64), which is handled within the generate_wilderness_centers function.
-                if map_pixel_has_df_location:
-                    centers = generate_wilderness_centers(True, exclusions, x, y, True, heatmap)
-                else:
-                    road_centers = cell_center_from_direction(combined_paths, has_any_path)
-                    road_centers = [center for center in road_centers if should_generate_location(road_chance, x, y, heatmap)]
-                    wilderness_centers = generate_wilderness_centers(has_any_path, exclusions, x, y, False, heatmap)
-                    centers = road_centers + wilderness_centers
-
-                for terrainX, terrainY in centers:
-                    # Convert terrain coordinates (0-127) to cell coordinates (0-2) and adjust for water map checking
-                    cell_x = (x * 3) + (terrainX // (128 // 3))
-                    cell_y = (y * 3) + (terrainY // (128 // 3))
-
-                    # Skip if the center of the cell would be in water or if it's a town exclusion
-                    if is_center_water_pixel(cell_x, cell_y, water_map) or (x, y) in town_exclusions:
-                        continue
-
-                    # Calculate GIS coordinates
-                    gisX, gisY = calculate_gis_coordinates(x, y, terrainX, terrainY)
-
-                    # Generate locationID with leading zeros if necessary
-                    locationID = f"{x:02}{terrainX:02}{y:02}{terrainY:02}"
-
-                    # Write to CSV if the cell is not water
-                    writer.writerow(['', '', '', x, y, terrainX, terrainY, locationID, gisX, gisY])
-
-# Example usage
-generate_csv_with_locations('roadData.bytes', 'trackData.bytes', 'DFLocations.csv', 'DFWaterMap.png', 'locations.csv', 'DFPopHeatMap.png')
 
 
@@ -0,0 +1,126 @@
+"""
+Per-map-pixel index over a generated locations CSV.
+
+The locations are sorted by map pixel (worldY * width + worldX) and an offsets
+array of width * height + 1 entries is kept alongside them (CSR style), so the
+locations of pixel p are rows offsets[p]:offsets[p + 1] of the sorted columns.
+A point lookup is two array reads, and a rectangle is one contiguous range per
+map row.
+
+The compiled index is cached next to the CSV (see npz_cache.py) with its own
+.locindex.npz suffix, so it never overwrites a DFLocations .index.npz cache
+built from the same CSV.
+"""
+import os
+import numpy as np
+from npz_cache import load_cached_npz
+from path_geometry import TERRAIN_SIZE
+
+DEFAULT_LOCATIONS_FILE = 'updated_locations_off_roads_tracks.csv'
+INT_COLUMNS = ['worldX', 'worldY', 'terrainX', 'terrainY', 'locationID']
+NAME_COLUMNS = ['name', 'prefab', 'region']
+
+def index_cache_filename(csv_filename):
+    return os.path.splitext(csv_filename)[0] + '.locindex.npz'
+
+def encode_strings(values):
+    """Return (names, codes) with names[codes] == values."""
+    names, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return names, codes.astype(np.uint16 if len(names) <= 0xFFFF else np.uint32)
+
+def build_location_index(csv_filename, width=1000, height=500, terrain_size=TERRAIN_SIZE):
+    """
+    Sort the locations of a CSV by map pixel and compute the per-pixel offsets.
+    terrain_size is the terrain tile size of the world spec (see world_spec.py).
+    """
+    import pandas as pd
+    df = pd.read_csv(csv_filename)
+    pixel = df['worldY'].to_numpy(dtype=np.int64) * width + df['worldX'].to_numpy(dtype=np.int64)
+    if len(pixel) and (pixel.min() < 0 or pixel.max() >= width * height):
+        raise ValueError(f"{csv_filename} has locations outside the {width}x{height} map")
+    order = np.argsort(pixel, kind='stable')
+
+    index = {
+        'width': np.array(width),
+        'height': np.array(height),
+        'terrain_size': np.array(terrain_size),
+        'offsets': np.concatenate([[0], np.cumsum(np.bincount(pixel, minlength=width * height))]).astype(np.int64),
+        # Row of each sorted location in the CSV
+        'row': order.astype(np.int64),
+    }
+    for column in INT_COLUMNS:
+        index[column] = df[column].fillna(0).to_numpy(dtype=np.int64)[order]
+    for column in NAME_COLUMNS:
+        if column in df.columns:
+            names, codes = encode_strings(df[column].fillna(''))
+            index[column + '_names'] = names
+            index[column] = codes[order]
+    return index
+
+def load_location_index(csv_filename=DEFAULT_LOCATIONS_FILE, width=1000, height=500, cache_filename=None,
+                        terrain_size=TERRAIN_SIZE):
+    """The location index of csv_filename, cached per map size and terrain_size."""
+    return load_cached_npz(csv_filename, cache_filename or index_cache_filename(csv_filename),
+                           lambda: build_location_index(csv_filename, width, height, terrain_size),
+                           lambda index: (index['width'] == width and index['height'] == height
+                                          and index.get('terrain_size') == terrain_size),
+                           "location index")
+
+def pixel_ranges(index, xs, ys):
+    """(start, stop) into the sorted locations for each map pixel (x, y)."""
+    pixel = np.asarray(ys, dtype=np.int64) * int(index['width']) + np.asarray(xs, dtype=np.int64)
+    return index['offsets'][pixel], index['offsets'][pixel + 1]
+
+def concat_ranges(starts, stops):
+    """Concatenate the half-open ranges [start, stop) into one position array."""
+    lengths = stops - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    # Offset of each position from the start of its own range
+    ends = np.cumsum(lengths)
+    steps = np.arange(total) - np.repeat(ends - lengths, lengths)
+    return np.repeat(starts, lengths) + steps
+
+def locations_at(index, x, y):
+    """Positions (into the index columns) of the locations at map pixel (x, y)."""
+    pixel = int(y) * int(index['width']) + int(x)
+    return np.arange(index['offsets'][pixel], index['offsets'][pixel + 1])
+
+def locations_in_rect(index, x0, y0, x1, y1):
+    """Positions of the locations in the half-open pixel window [x0, x1) x [y0, y1)."""
+    width, height = int(index['width']), int(index['height'])
+    x0, x1 = max(x0, 0), min(x1, width)
+    y0, y1 = max(y0, 0), min(y1, height)
+    if x0 >= x1 or y0 >= y1:
+        return np.zeros(0, dtype=np.int64)
+    rows = np.arange(y0, y1)
+    # Each map row of the window is one contiguous range of sorted locations
+    starts, _ = pixel_ranges(index, np.full(len(rows), x0), rows)
+    _, stops = pixel_ranges(index, np.full(len(rows), x1 - 1), rows)
+    return concat_ranges(starts, stops)
+
+def map_positions(index, positions):
+    """Fractional map coordinates (x, y) of locations, from their world and terrain coordinates."""
+    terrain_size = float(index['terrain_size'])
+    x = index['worldX'][positions] + index['terrainX'][positions] / terrain_size
+    # terrainY grows to the north while map rows grow to the south
+    y = index['worldY'][positions] + 1 - index['terrainY'][positions] / terrain_size
+    return x, y
+
+def locations_in_radius(index, x, y, radius):
+    """Positions of the locations within `radius` map pixels of map coordinates (x, y)."""
+    positions = locations_in_rect(index, int(np.floor(x - radius)), int(np.floor(y - radius)),
+                                  int(np.floor(x + radius)) + 1, int(np.floor(y + radius)) + 1)
+    px, py = map_positions(index, positions)
+    return positions[(px - x) ** 2 + (py - y) ** 2 <= radius ** 2]
+
+def records(index, positions):
+    """Column dict (names decoded) for the given positions."""
+    result = {'row': index['row'][positions]}
+    for column in INT_COLUMNS:
+        result[column] = index[column][positions]
+    for column in NAME_COLUMNS:
+        if column + '_names' in index:
+            result[column] = index[column + '_names'][index[column][positions]]
+    return result
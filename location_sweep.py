@@ -0,0 +1,103 @@
+"""
+Monte Carlo sweep over the generation chances.
+
+The generation context of the sparse mode (eligible sub-cells grouped by
+heatmap scaling, see build_generation_context in sparse_generation.py) does
+not depend on the chances, so it is built once and shared by every run. Each
+(setting, seed) run only draws from it and counts the locations per region and
+per climate, which takes milliseconds; runs are spread over a process pool
+that receives the context once per worker.
+
+Every run gets its own random stream spawned from one SeedSequence, so the
+results don't depend on how runs are scheduled over the workers.
+
+A sub-cell picked by more than one kind of trial (e.g. both the road and the
+track roll) is counted once, as add-loc-data.py keeps one row per locationID,
+so the counts match what the pipeline actually produces.
+"""
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sparse_generation import sample_sparse_locations
+
+SETTING_COLUMNS = ['wilderness_chance', 'track_chance', 'road_chance', 'heatmap']
+PERCENTILES = [5, 50, 95]
+
+# Per-process state, set once by init_worker
+worker_state = {}
+
+def sweep_settings(wilderness_chances, track_chances, road_chances, heatmaps=(True,)):
+    """Every combination of the given values, as a list of setting dicts."""
+    return [dict(zip(SETTING_COLUMNS, values))
+            for values in itertools.product(wilderness_chances, track_chances, road_chances, heatmaps)]
+
+def init_worker(context, region_codes, climate_codes):
+    worker_state['context'] = context
+    worker_state['region'] = region_codes.reshape(-1)
+    worker_state['climate'] = climate_codes.reshape(-1)
+
+def unique_locations(xs, ys, terrainXs, terrainYs):
+    """
+    Keep one of each (worldX, worldY, terrainX, terrainY); the sampler returns
+    them sorted by map pixel and sub-cell, so duplicates are adjacent.
+    """
+    keep = np.ones(len(xs), dtype=bool)
+    keep[1:] = (np.diff(xs) != 0) | (np.diff(ys) != 0) | (np.diff(terrainXs) != 0) | (np.diff(terrainYs) != 0)
+    return xs[keep], ys[keep]
+
+def run_setting(setting, seed_sequence):
+    """Location counts per region and per climate for one run, after removing duplicate sub-cells."""
+    chances = {'road': setting['road_chance'], 'track': setting['track_chance'],
+               'wilderness': setting['wilderness_chance']}
+    xs, ys = unique_locations(*sample_sparse_locations(worker_state['context'], chances,
+                                                        np.random.default_rng(seed_sequence), setting['heatmap']))
+    pixel = ys * worker_state['context']['width'] + xs
+    region = np.bincount(worker_state['region'][pixel], minlength=worker_state['region'].max() + 1)
+    climate = np.bincount(worker_state['climate'][pixel], minlength=worker_state['climate'].max() + 1)
+    return region, climate
+
+def run_runs(runs, context, region_codes, climate_codes, max_workers=None):
+    """Results of run_setting for every (setting, seed sequence), in order."""
+    settings, seeds = zip(*runs) if runs else ((), ())
+    if max_workers == 1:
+        init_worker(context, region_codes, climate_codes)
+        return [run_setting(setting, seed) for setting, seed in runs]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker,
+                             initargs=(context, region_codes, climate_codes)) as executor:
+        return list(executor.map(run_setting, settings, seeds, chunksize=4))
+
+def count_statistics(counts):
+    """Distribution statistics of a (runs,) array of counts."""
+    stats = {'mean': counts.mean(), 'std': counts.std(ddof=1) if len(counts) > 1 else 0.0,
+             'min': counts.min(), 'max': counts.max()}
+    for percentile, value in zip(PERCENTILES, np.percentile(counts, PERCENTILES)):
+        stats[f"p{percentile:02}"] = value
+    return stats
+
+def sweep(context, settings, seeds, region_codes, region_names, climate_codes, climate_names,
+          seed=None, max_workers=None):
+    """
+    Run every setting `seeds` times and return a DataFrame with one row per
+    (setting, group, value): group is 'total', 'region' or 'climate'.
+    """
+    import pandas as pd
+    sequences = np.random.SeedSequence(seed).spawn(len(settings) * seeds)
+    runs = [(setting, sequences[i * seeds + j]) for i, setting in enumerate(settings) for j in range(seeds)]
+    results = run_runs(runs, context, region_codes, climate_codes, max_workers)
+
+    rows = []
+    for i, setting in enumerate(settings):
+        setting_results = results[i * seeds:(i + 1) * seeds]
+        region = np.zeros((seeds, len(region_names)), dtype=np.int64)
+        climate = np.zeros((seeds, len(climate_names)), dtype=np.int64)
+        for j, (region_counts, climate_counts) in enumerate(setting_results):
+            region[j, :len(region_counts)] = region_counts
+            climate[j, :len(climate_counts)] = climate_counts
+        groups = [('total', '', region.sum(axis=1))]
+        groups += [('region', name or '(none)', region[:, k]) for k, name in enumerate(region_names)]
+        groups += [('climate', name, climate[:, k]) for k, name in enumerate(climate_names)]
+        for group, value, counts in groups:
+            if group != 'total' and not counts.any():
+                continue
+            rows.append(dict(setting, group=group, value=value, **count_statistics(counts)))
+    return pd.DataFrame(rows)
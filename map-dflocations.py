@@ -1,29 +1,25 @@
 import csv
+import numpy as np
 from PIL import Image
 
 def generate_image(csv_file, output_file, width=1000, height=500):
-    # Create a new black image
-    img = Image.new('RGB', (width, height), color='black')
-
-    # Open the CSV file and iterate through rows
+    # Read worldX and worldY of every row
     with open(csv_file, 'r') as file:
         reader = csv.DictReader(file)
-        for row in reader:
-            # Extract worldX and worldY from the row
-            worldX = int(row['worldX'])
-            worldY = int(row['worldY'])
+        coords = np.array([(int(row['worldX']), int(row['worldY'])) for row in reader], dtype=np.int64).reshape(-1, 2)
+
+    # Map the worldX and worldY to pixel coordinates
+    pixelX = coords[:, 0] - 1  # Adjust for 0-based indexing
+    pixelY = height - coords[:, 1]  # Flip Y-axis
 
-            # Map the worldX and worldY to pixel coordinates
-            pixelX = worldX - 1  # Adjust for 0-based indexing
-            pixelY = height - worldY  # Flip Y-axis
-            # Set the pixel to white
-            img.putpixel((pixelX, pixelY), (255, 255, 255))
+    # Set all the pixels to white on a black image at once
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+    pixels[pixelY, pixelX] = 255
 
     # Save the image
-    img.save(output_file)
+    Image.fromarray(pixels, 'RGB').save(output_file)
 
 if __name__ == "__main__":
     csv_file = 'DFLocations.csv'
     output_file = 'output.png'
     generate_image(csv_file, output_file)
-
@@ -0,0 +1,28 @@
+"""
+.npz caches of arrays compiled from a slower source file.
+
+The DFLocations index, the location index and the region raster are each
+compiled from a CSV or GeoPackage into a dict of arrays, saved next to the
+source as an .npz file and rebuilt whenever the source is newer than the cache
+or the cached arrays don't fit the requested map.
+"""
+import os
+import numpy as np
+
+def load_cached_npz(source_filename, cache_filename, build, is_valid, description):
+    """
+    The arrays cached in cache_filename if it is at least as new as
+    source_filename and is_valid(arrays) holds; otherwise build() them and
+    rewrite the cache (a read-only directory only costs the cache).
+    """
+    if os.path.exists(cache_filename) and os.path.getmtime(cache_filename) >= os.path.getmtime(source_filename):
+        with np.load(cache_filename) as cached:
+            arrays = {key: cached[key] for key in cached.files}
+        if is_valid(arrays):
+            return arrays
+    arrays = build()
+    try:
+        np.savez(cache_filename, **arrays)
+    except OSError:
+        print(f"Could not write {description} cache {cache_filename}, continuing without it")
+    return arrays
@@ -0,0 +1,70 @@
+"""
+Vectorized geometry for the 8-direction path grids (roads, tracks, rivers and streams).
+
+Each map pixel byte holds one bit per direction. A set bit means a path segment
+runs from the centre of the 128x128 terrain tile (64, 64) to the tile edge or
+corner in that direction; terrainY grows to the north, as in the rest of the
+pipeline. The helpers here test whole batches of locations against those
+segments at once instead of looping over rows.
+"""
+import numpy as np
+
+# Direction names in bit order, most significant bit first
+DIRECTIONS = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
+DIRECTION_BITS = np.array([0b10000000 >> i for i in range(8)], dtype=np.uint8)
+
+# Unit step of each direction in terrain coordinates
+DIRECTION_STEPS = np.array([
+    (0, 1), (1, 1), (1, 0), (1, -1),
+    (0, -1), (-1, -1), (-1, 0), (-1, 1)
+], dtype=np.float64)
+
+TERRAIN_SIZE = 128
+TILE_CENTER = TERRAIN_SIZE / 2
+
+def direction_bits(directions):
+    """Combine direction names (e.g. 'N|SE' split into a list) into a path byte."""
+    bits = 0
+    for direction in directions:
+        if direction in DIRECTIONS:
+            bits |= int(DIRECTION_BITS[DIRECTIONS.index(direction)])
+    return bits
+
+# Pipe-separated direction string for every possible path byte
+PATH_STRINGS = np.array(['|'.join(d for d, b in zip(DIRECTIONS, DIRECTION_BITS) if value & b) for value in range(256)],
+                        dtype=object)
+
+def bits_to_strings(bits):
+    """Convert an array of path bytes to pipe-separated direction strings."""
+    return PATH_STRINGS[np.asarray(bits, dtype=np.uint8)]
+
+def footprint_crossings(bits, terrainX, terrainY, sizeX, sizeY, buffer=0, tile_center=TILE_CENTER):
+    """
+    Test rectangular footprints centred on (terrainX, terrainY) against the path
+    segments set in `bits`. Returns an (N, 8) boolean array, one column per direction.
+    tile_center is half the terrain tile size (see world_spec.py).
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    cx = np.asarray(terrainX, dtype=np.float64)[:, None]
+    cy = np.asarray(terrainY, dtype=np.float64)[:, None]
+    hx = np.asarray(sizeX, dtype=np.float64)[:, None] / 2 + buffer
+    hy = np.asarray(sizeY, dtype=np.float64)[:, None] / 2 + buffer
+
+    # Segment end points, shape (8,)
+    x0 = y0 = tile_center
+    x1 = tile_center + DIRECTION_STEPS[:, 0] * tile_center
+    y1 = tile_center + DIRECTION_STEPS[:, 1] * tile_center
+
+    # Separating axis test: the box and segment are apart if their projections
+    # don't overlap on the x axis, the y axis or the segment normal
+    apart_x = (np.maximum(x0, x1) < cx - hx) | (np.minimum(x0, x1) > cx + hx)
+    apart_y = (np.maximum(y0, y1) < cy - hy) | (np.minimum(y0, y1) > cy + hy)
+    nx, ny = -(y1 - y0), x1 - x0
+    apart_normal = np.abs(nx * (cx - x0) + ny * (cy - y0)) > np.abs(nx) * hx + np.abs(ny) * hy
+
+    present = (bits[:, None] & DIRECTION_BITS) != 0
+    return present & ~(apart_x | apart_y | apart_normal)
+
+def footprint_crosses_paths(bits, terrainX, terrainY, sizeX, sizeY, buffer=0, tile_center=TILE_CENTER):
+    """Boolean array: True where a footprint touches any path segment in its pixel."""
+    return footprint_crossings(bits, terrainX, terrainY, sizeX, sizeY, buffer, tile_center).any(axis=1)
@@ -0,0 +1,184 @@
+"""
+Layered container for the 8-direction path grids.
+
+The road, track, river and stream grids are stored together in one file
+(paths.grid by default) as a (height, width, 4) uint8 array behind a small
+header, and memory-mapped on load so every stage can query all four layers
+without reading them into memory or knowing the map size in advance.
+
+Header layout (little endian, HEADER_SIZE bytes, zero padded):
+    8s  magic b'WODPATHS'
+    H   format version
+    I   width in map pixels
+    I   height in map pixels
+    H   number of layers
+    I   size in bytes of the source list that follows the header
+    8s  name of each layer, in storage order
+
+The source list is UTF-8 JSON mapping each layer to the absolute path of the
+.bytes file it was built from (null for a layer stored empty). A grid is only
+ever rebuilt from those files, so a grid built from custom paths is never
+refreshed from the default files that happen to sit next to it.
+
+Each byte keeps the bit layout of the original .bytes files (N is the most
+significant bit, then NE, E, SE, S, SW, W, NW). On the map grid north is row
+y - 1, as in roads-gis.py.
+"""
+import json
+import os
+import struct
+import numpy as np
+from path_geometry import DIRECTION_BITS
+
+MAGIC = b'WODPATHS'
+VERSION = 1
+HEADER_SIZE = 64
+HEADER_FORMAT = '<8sHIIHI'
+
+LAYERS = ['road', 'track', 'river', 'stream']
+LAYER_FILES = {
+    'road': 'roadData.bytes',
+    'track': 'trackData.bytes',
+    'river': 'riverData.bytes',
+    'stream': 'streamData.bytes',
+}
+DEFAULT_GRID_FILE = 'paths.grid'
+
+# Map grid step (dx, dy) of each direction bit, most significant bit first
+NEIGHBOUR_STEPS = np.array([
+    (0, -1), (1, -1), (1, 0), (1, 1),
+    (0, 1), (-1, 1), (-1, 0), (-1, -1)
+], dtype=np.int64)
+OPPOSITE_BITS = np.roll(DIRECTION_BITS, 4)
+
+def write_path_grid(filename, layers, names=LAYERS, sources=None):
+    """
+    Write a (height, width, n) uint8 array of path bytes as a layered grid file,
+    recording the {layer: .bytes path} it was built from.
+    """
+    layers = np.ascontiguousarray(layers, dtype=np.uint8)
+    height, width, count = layers.shape
+    source_list = json.dumps(sources or {}).encode('utf-8')
+    # Pad so the layers start on an 8-byte boundary
+    source_list = source_list.ljust(-(-len(source_list) // 8) * 8, b' ')
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, width, height, count, len(source_list))
+    header += b''.join(struct.pack('8s', name.encode('ascii')) for name in names)
+    with open(filename, 'wb') as file:
+        file.write(header.ljust(HEADER_SIZE, b'\0'))
+        file.write(source_list)
+        file.write(layers.tobytes())
+
+def build_path_grid(filename=DEFAULT_GRID_FILE, layer_files=None, width=1000):
+    """
+    Combine the per-layer .bytes files (which carry no header, hence `width`)
+    into one layered grid file. Missing river/stream files, and layers given
+    as None, become empty layers.
+    """
+    files = dict(LAYER_FILES)
+    files.update(layer_files or {})
+    grids = []
+    sources = {}
+    for name in LAYERS:
+        sources[name] = os.path.abspath(files[name]) if files[name] and os.path.exists(files[name]) else None
+        if sources[name]:
+            grids.append(np.fromfile(files[name], dtype=np.uint8).reshape(-1, width))
+        elif name in ('road', 'track'):
+            raise FileNotFoundError(f"Path layer '{name}' not found: {files[name]}")
+        else:
+            if files[name]:
+                print(f"Path layer '{name}' not found at {files[name]}, storing it empty")
+            grids.append(None)
+    height = grids[0].shape[0]
+    grids = [np.zeros((height, width), dtype=np.uint8) if grid is None else grid for grid in grids]
+    write_path_grid(filename, np.stack(grids, axis=-1), sources=sources)
+
+def read_header(filename):
+    """
+    Return (width, height, layer names, {layer: source path}, data offset)
+    from a layered grid file.
+    """
+    with open(filename, 'rb') as file:
+        header = file.read(HEADER_SIZE)
+        magic, version, width, height, count, source_size = struct.unpack_from(HEADER_FORMAT, header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filename} is not a version {VERSION} path grid")
+        sources = json.loads(file.read(source_size).decode('utf-8'))
+    offset = struct.calcsize(HEADER_FORMAT)
+    names = [struct.unpack_from('8s', header, offset + 8 * i)[0].rstrip(b'\0').decode('ascii') for i in range(count)]
+    return width, height, names, sources, HEADER_SIZE + source_size
+
+def open_path_grid(filename=DEFAULT_GRID_FILE):
+    """Memory-map a layered grid file as a read-only (height, width, layers) array."""
+    width, height, names, _, offset = read_header(filename)
+    if names != LAYERS:
+        raise ValueError(f"{filename} has layers {names}, expected {LAYERS}")
+    return np.memmap(filename, dtype=np.uint8, mode='r', offset=offset, shape=(height, width, len(names)))
+
+def default_layer_files(filename):
+    """The default .bytes files next to a grid file, used when the grid doesn't exist yet."""
+    directory = os.path.dirname(filename)
+    return {name: os.path.join(directory, path) for name, path in LAYER_FILES.items()}
+
+def path_grid_sources(filename=DEFAULT_GRID_FILE):
+    """
+    The .bytes files a grid depends on: the ones recorded in its header, or
+    the defaults next to it while the grid doesn't exist yet.
+    """
+    if not os.path.exists(filename):
+        return default_layer_files(filename)
+    return {name: path for name, path in read_header(filename)[3].items() if path}
+
+def load_path_grid(filename=DEFAULT_GRID_FILE, layer_files=None, width=1000):
+    """
+    Open the layered grid. A missing grid is built from `layer_files` (default:
+    the .bytes files next to it); an existing one is rebuilt only when one of
+    the .bytes files recorded in its header is newer than it.
+    """
+    if not os.path.exists(filename):
+        files = default_layer_files(filename)
+        files.update(layer_files or {})
+        build_path_grid(filename, files, width)
+        return open_path_grid(filename)
+    grid_width, _, _, sources, _ = read_header(filename)
+    recorded = [path for path in sources.values() if path]
+    missing = [path for path in recorded if not os.path.exists(path)]
+    stale = [path for path in recorded if path not in missing and os.path.getmtime(path) > os.path.getmtime(filename)]
+    if missing:
+        print(f"{filename}: source files {', '.join(missing)} are gone, using the grid as it is")
+    elif stale:
+        print(f"Rebuilding {filename}: {', '.join(stale)} changed")
+        # Every layer exactly as recorded; None keeps a layer that was stored empty empty
+        build_path_grid(filename, {name: sources.get(name) for name in LAYERS}, grid_width)
+    return open_path_grid(filename)
+
+def layer_indices(layers):
+    """Storage indices of the named layers; None means all of them."""
+    return list(range(len(LAYERS))) if layers is None else [LAYERS.index(name) for name in layers]
+
+def path_bits(grid, xs, ys, layers=None):
+    """Combined (OR-ed) path byte of the given layers at each (x, y)."""
+    return np.bitwise_or.reduce(grid[ys, xs][..., layer_indices(layers)], axis=-1)
+
+def any_path(grid, xs, ys, layers=None):
+    """True where any of the given layers has a path at (x, y)."""
+    return path_bits(grid, xs, ys, layers) != 0
+
+def window(grid, x0, y0, x1, y1, layers=None):
+    """All (or the given) layers in the half-open window [x0, x1) x [y0, y1)."""
+    return grid[y0:y1, x0:x1][..., layer_indices(layers)]
+
+def neighbour_connectivity(grid, xs, ys, layer='road'):
+    """
+    (N, 8) boolean array: True where the pixel's path in a direction is matched
+    by the neighbouring pixel's path back in the opposite direction.
+    """
+    height, width = grid.shape[:2]
+    index = LAYERS.index(layer)
+    xs = np.asarray(xs, dtype=np.int64)
+    ys = np.asarray(ys, dtype=np.int64)
+    nx = xs[:, None] + NEIGHBOUR_STEPS[:, 0]
+    ny = ys[:, None] + NEIGHBOUR_STEPS[:, 1]
+    inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+    here = grid[ys, xs, index][:, None]
+    there = grid[np.clip(ny, 0, height - 1), np.clip(nx, 0, width - 1), index]
+    return inside & ((here & DIRECTION_BITS) != 0) & ((there & OPPOSITE_BITS) != 0)
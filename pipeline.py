@@ -0,0 +1,349 @@
+"""
+Command line entry point for the location generation pipeline.
+
+Each stage script is only loaded when its subcommand runs, so pandas, NumPy,
+PIL and geopandas are never imported for a stage that does not need them and
+`pipeline.py --help` starts instantly. The stage scripts can also still be
+run on their own with their default paths.
+
+Typical run, in order:
+    python pipeline.py generate
+    python pipeline.py add-loc-data
+    python pipeline.py populate
+    python pipeline.py add-prefab-data
+    python pipeline.py push-prefabs
+    python pipeline.py validate
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_stage(filename):
+    """Import a stage script by file name (most have hyphens, so `import` can't reach them)."""
+    path = os.path.join(SCRIPT_DIR, filename)
+    module_name = os.path.splitext(os.path.basename(filename))[0].replace('-', '_')
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    # Stage scripts import the shared helper modules and the scripts next to them
+    for directory in (SCRIPT_DIR, os.path.dirname(path)):
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def world_spec(args):
+    """The world spec from --world-spec, or from world_spec.json / the defaults (see world_spec.py)."""
+    from world_spec import load_world_spec
+    return load_world_spec(args.world_spec)
+
+def run_generate(args):
+    stage = load_stage('generate-locations.py')
+    stage.generate_csv_with_locations(args.paths, args.dflocations, args.water_map, args.output, args.heatmap,
+                                      args.avoid_water_paths, args.mode, args.seed, world_spec(args),
+                                      args.location_names)
+
+def run_sweep(args):
+    from location_sweep import sweep_settings
+    stage = load_stage('generate-locations.py')
+    heatmaps = [value == 'on' for value in args.heatmap.split(',')]
+    settings = sweep_settings(int_list(args.wilderness), int_list(args.track), int_list(args.road), heatmaps)
+    stats = stage.sweep_chances(args.paths, args.dflocations, args.water_map, args.heatmap_map, args.climate_map,
+                                args.regions, settings, args.seeds, args.output, args.avoid_water_paths,
+                                args.seed, args.workers, world_spec(args), args.location_names)
+    totals = stats[stats['group'] == 'total']
+    print(totals[['wilderness_chance', 'track_chance', 'road_chance', 'heatmap', 'mean', 'std', 'p05', 'p95']]
+          .to_string(index=False))
+    print(f"{len(settings)} settings x {args.seeds} seeds; statistics saved to {args.output}")
+
+def int_list(text):
+    return [int(value) for value in text.split(',')]
+
+def run_add_loc_data(args):
+    stage = load_stage('add-loc-data.py')
+    stage.update_csv_with_all_data(args.locations, args.paths, args.dflocations, args.climate_map, args.regions,
+                                   world_spec(args))
+
+def run_populate(args):
+    stage = load_stage('populate-locations.py')
+    stage.main(args.locations, args.rules, args.output)
+
+def run_add_prefab_data(args):
+    stage = load_stage('add-prefab-data.py')
+    stage.update_locations_with_lookup(args.locations, args.location_names, args.output, args.prefab_dir)
+
+def run_push_prefabs(args):
+    stage = load_stage('push-prefabs.py')
+    stage.push_prefabs(args.locations, args.output, args.paths if args.avoid_water_paths else None, args.prefab_dir,
+                       args.exact_footprints, world_spec(args))
+
+def run_prefab_sizes(args):
+    stage = load_stage(os.path.join('prefabs', 'get-prefab-sizes.py'))
+    stage.update_prefab_sizes(args.location_names, args.prefab_dir)
+
+def run_prefab_catalog(args):
+    from prefab_catalog import build_prefab_catalog
+    catalog = build_prefab_catalog(args.prefab_dir, args.output, args.workers)
+    print(f"{len(catalog['name'])} prefabs in catalog")
+
+def run_split(args):
+    stage = load_stage(os.path.join('split', 'splitallcsv.py'))
+    stage.partition_csv(args.locations, args.output_dir)
+
+def run_split_bin(args):
+    stage = load_stage(os.path.join('split', 'splitallbin.py'))
+    stage.partition_bin(args.locations, args.output_dir)
+
+def run_roads_gis(args):
+    stage = load_stage('roads-gis.py')
+    stage.export_path_geometries(args.roads, args.tracks, args.road_output, args.track_output,
+                                 world_spec(args))
+
+def run_map(args):
+    stage = load_stage('map-dflocations.py')
+    stage.generate_image(args.locations, args.output)
+
+def run_build_paths(args):
+    from path_grid import build_path_grid
+    layer_files = {'road': args.roads, 'track': args.tracks, 'river': args.rivers, 'stream': args.streams}
+    build_path_grid(args.output, layer_files, args.width or world_spec(args)['width'])
+    print(f"Path grid saved to {args.output}")
+
+def run_paths(args):
+    from path_grid import LAYERS, load_path_grid
+    from path_geometry import bits_to_strings
+    grid = load_path_grid(args.paths, width=world_spec(args)['width'])
+    for layer, bits in zip(LAYERS, grid[args.y, args.x]):
+        print(f"{layer}: {bits_to_strings(bits)}")
+
+def run_locate(args):
+    from location_index import load_location_index, locations_at, locations_in_radius, records
+    spec = world_spec(args)
+    index = load_location_index(args.locations, spec['width'], spec['height'], terrain_size=spec['terrain_size'])
+    if args.radius is None:
+        positions = locations_at(index, args.x, args.y)
+    else:
+        positions = locations_in_radius(index, args.x + 0.5, args.y + 0.5, args.radius)
+    found = records(index, positions)
+    for i in range(len(positions)):
+        print(', '.join(f"{column}={values[i]}" for column, values in found.items()))
+    print(f"{len(positions)} locations")
+
+def run_serve(args):
+    from query_server import serve
+    serve({
+        'paths': args.paths,
+        'climate': args.climate_map,
+        'region_raster': args.regions,
+        'dflocations': args.dflocations,
+        'locations': args.locations,
+    }, args.host, args.port, args.reload_interval, world_spec(args))
+
+def run_preview(args):
+    from preview import render_preview
+    render_preview(args.output, args.layers.split(','), {
+        'paths': args.paths,
+        'dflocations': args.dflocations,
+        'locations': args.locations,
+    }, args.tile, args.scale, world_spec(args))
+    print(f"Preview saved to {args.output}")
+
+def run_diff(args):
+    from diff_runs import diff_runs, render_diff_image, summarize
+    spec = world_spec(args)
+    merged = diff_runs(args.old, args.new)
+    print(summarize(merged, args.top, spec['terrain_size']))
+    if args.csv:
+        merged[merged['status'] != 'unchanged'].to_csv(args.csv, index=False)
+        print(f"Changed locations saved to {args.csv}")
+    if args.image:
+        render_diff_image(merged, args.image, spec['width'], spec['height'])
+        print(f"Changed pixels saved to {args.image}")
+
+def run_validate(args):
+    from validate import report, validate_locations
+    df, failures = validate_locations(args.locations, args.paths, args.water_map, world_spec(args))
+    print(report(df, failures, args.examples))
+    failed = sum(int(mask.sum()) for mask in failures.values())
+    if failed:
+        sys.exit(f"Validation failed: {failed} invariant violations in {args.locations}")
+    print("All checks passed")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Wilderness location generation pipeline.")
+    parser.add_argument('--world-spec', help="JSON file with the world size and sub-cell layout "
+                        "(default: world_spec.json if present, else the Daggerfall map).")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate = subparsers.add_parser('generate', help="Generate candidate locations from the path grids.")
+    generate.add_argument('--paths', default='paths.grid')
+    generate.add_argument('--dflocations', default='DFLocations.csv')
+    generate.add_argument('--water-map', default='DFWaterMap.png')
+    generate.add_argument('--heatmap', default='DFPopHeatMap.png')
+    generate.add_argument('--output', default='locations.csv')
+    generate.add_argument('--avoid-water-paths', action='store_true', help="Reject centers crossing a river or stream.")
+    generate.add_argument('--location-names', default='location_names.csv',
+                          help="Prefab sizes; the largest is the footprint tested against rivers and streams.")
+    generate.add_argument('--mode', choices=['dense', 'sparse'], default='dense',
+                          help="'sparse' samples only eligible sub-cells instead of visiting every map pixel.")
+    generate.add_argument('--seed', type=int, help="Random seed, for reproducible runs.")
+    generate.set_defaults(run=run_generate)
+
+    sweep = subparsers.add_parser('sweep', help="Monte Carlo sweep of the generation chances (sparse mode).")
+    sweep.add_argument('--wilderness', default='32', help="Comma-separated wilderness chances to try.")
+    sweep.add_argument('--track', default='9', help="Comma-separated track chances to try.")
+    sweep.add_argument('--road', default='3', help="Comma-separated road chances to try.")
+    sweep.add_argument('--heatmap', default='on', help="'on', 'off' or 'on,off': scale the chances by the heatmap.")
+    sweep.add_argument('--seeds', type=int, default=10, help="Runs per setting.")
+    sweep.add_argument('--seed', type=int, help="Base random seed, for reproducible sweeps.")
+    sweep.add_argument('--workers', type=int, help="Worker processes (default: one per CPU).")
+    sweep.add_argument('--paths', default='paths.grid')
+    sweep.add_argument('--dflocations', default='DFLocations.csv')
+    sweep.add_argument('--water-map', default='DFWaterMap.png')
+    sweep.add_argument('--heatmap-map', default='DFPopHeatMap.png')
+    sweep.add_argument('--climate-map', default='DFClimateMap.png')
+    sweep.add_argument('--regions', default='Regions.gpkg')
+    sweep.add_argument('--avoid-water-paths', action='store_true', help="Reject centers crossing a river or stream.")
+    sweep.add_argument('--location-names', default='location_names.csv',
+                       help="Prefab sizes; the largest is the footprint tested against rivers and streams.")
+    sweep.add_argument('--output', default='sweep.csv')
+    sweep.set_defaults(run=run_sweep)
+
+    add_loc_data = subparsers.add_parser('add-loc-data', help="Add roads, tracks, DF types, climate and region.")
+    add_loc_data.add_argument('--locations', default='locations.csv',
+                              help="Input CSV; the output is written to updated_<locations>.")
+    add_loc_data.add_argument('--paths', default='paths.grid')
+    add_loc_data.add_argument('--dflocations', default='DFLocations.csv')
+    add_loc_data.add_argument('--climate-map', default='DFClimateMap.png')
+    add_loc_data.add_argument('--regions', default='Regions.gpkg')
+    add_loc_data.set_defaults(run=run_add_loc_data)
+
+    populate = subparsers.add_parser('populate', help="Choose a location name for every location from the rules.")
+    populate.add_argument('--locations', default='updated_locations.csv')
+    populate.add_argument('--rules', default='location_rules.csv')
+    populate.add_argument('--output', default='populated_locations.csv')
+    populate.set_defaults(run=run_populate)
+
+    add_prefab_data = subparsers.add_parser('add-prefab-data', help="Choose a prefab and size for every location.")
+    add_prefab_data.add_argument('--locations', default='populated_locations.csv')
+    add_prefab_data.add_argument('--location-names', default='location_names.csv')
+    add_prefab_data.add_argument('--output', default='updated_populated_locations.csv')
+    add_prefab_data.add_argument('--prefab-dir', help="Take sizes from the prefab catalog built from this directory.")
+    add_prefab_data.set_defaults(run=run_add_prefab_data)
+
+    push_prefabs = subparsers.add_parser('push-prefabs', help="Move locations off roads and tracks.")
+    push_prefabs.add_argument('--locations', default='updated_populated_locations.csv')
+    push_prefabs.add_argument('--output', default='updated_locations_off_roads_tracks.csv')
+    push_prefabs.add_argument('--paths', default='paths.grid')
+    push_prefabs.add_argument('--avoid-water-paths', action='store_true', help="Also move locations off rivers and streams.")
+    push_prefabs.add_argument('--prefab-dir', help="Fill missing sizes from the prefab catalog built from this directory.")
+    push_prefabs.add_argument('--exact-footprints', action='store_true',
+                              help="Move locations by their prefab objects' footprint (uses --prefab-dir, default prefabs).")
+    push_prefabs.set_defaults(run=run_push_prefabs)
+
+    prefab_sizes = subparsers.add_parser('prefab-sizes', help="Refresh sizeX/sizeY in a location names CSV from the prefabs.")
+    prefab_sizes.add_argument('--location-names', default=os.path.join('prefabs', 'location_names.csv'))
+    prefab_sizes.add_argument('--prefab-dir', default='prefabs')
+    prefab_sizes.set_defaults(run=run_prefab_sizes)
+
+    prefab_catalog = subparsers.add_parser('prefab-catalog', help="Build or refresh the binary prefab catalog.")
+    prefab_catalog.add_argument('--prefab-dir', default='prefabs')
+    prefab_catalog.add_argument('--output', help="Catalog file (default: <prefab-dir>/prefab_catalog.npz).")
+    prefab_catalog.add_argument('--workers', type=int, help="Parser processes (default: one per CPU).")
+    prefab_catalog.set_defaults(run=run_prefab_catalog)
+
+    split = subparsers.add_parser('split', help="Partition the final locations into one CSV per region.")
+    split.add_argument('--locations', default='Locations.csv')
+    split.add_argument('--output-dir', default='Locations')
+    split.set_defaults(run=run_split)
+
+    split_bin = subparsers.add_parser('split-bin', help="Partition the final locations into one binary file per region.")
+    split_bin.add_argument('--locations', default='Locations.csv')
+    split_bin.add_argument('--output-dir', default='Locations')
+    split_bin.set_defaults(run=run_split_bin)
+
+    roads_gis = subparsers.add_parser('roads-gis', help="Export the road and track grids as GeoPackage lines.")
+    roads_gis.add_argument('--roads', default='roadData.bytes')
+    roads_gis.add_argument('--tracks', default='trackData.bytes')
+    roads_gis.add_argument('--road-output', default='transformed_roads.gpkg')
+    roads_gis.add_argument('--track-output', default='transformed_tracks.gpkg')
+    roads_gis.set_defaults(run=run_roads_gis)
+
+    preview = subparsers.add_parser('preview', help="Render a layered preview image of the map or of a zoomed tile.")
+    preview.add_argument('--layers', default='roads,tracks,rivers,streams,dflocations,locations',
+                         help="Comma-separated: density, roads, tracks, rivers, streams, dflocations, locations.")
+    preview.add_argument('--locations', default='updated_locations_off_roads_tracks.csv')
+    preview.add_argument('--paths', default='paths.grid')
+    preview.add_argument('--dflocations', default='DFLocations.csv')
+    preview.add_argument('--tile', type=int, nargs=4, metavar=('X0', 'Y0', 'X1', 'Y1'),
+                         help="Render map pixels [X0, X1) x [Y0, Y1) at terrain resolution instead.")
+    preview.add_argument('--scale', type=int, default=32, help="Tile output pixels per map pixel.")
+    preview.add_argument('--output', default='preview.png')
+    preview.set_defaults(run=run_preview)
+
+    diff = subparsers.add_parser('diff', help="Compare two generation outputs joined on locationID.")
+    diff.add_argument('old')
+    diff.add_argument('new')
+    diff.add_argument('--top', type=int, default=10, help="Rows to list per table.")
+    diff.add_argument('--csv', help="Write every changed location, old and new columns side by side.")
+    diff.add_argument('--image', help="Write an image of the changed map pixels.")
+    diff.set_defaults(run=run_diff)
+
+    map_parser = subparsers.add_parser('map', help="Plot a locations CSV as white dots.")
+    map_parser.add_argument('--locations', default='DFLocations.csv')
+    map_parser.add_argument('--output', default='output.png')
+    map_parser.set_defaults(run=run_map)
+
+    build_paths = subparsers.add_parser('build-paths', help="Combine the path .bytes files into one layered grid.")
+    build_paths.add_argument('--roads', default='roadData.bytes')
+    build_paths.add_argument('--tracks', default='trackData.bytes')
+    build_paths.add_argument('--rivers', default='riverData.bytes')
+    build_paths.add_argument('--streams', default='streamData.bytes')
+    build_paths.add_argument('--width', type=int, help="Map width in pixels of the .bytes files (default: the world spec width).")
+    build_paths.add_argument('--output', default='paths.grid')
+    build_paths.set_defaults(run=run_build_paths)
+
+    paths = subparsers.add_parser('paths', help="Print the road, track, river and stream directions at a map pixel.")
+    paths.add_argument('x', type=int)
+    paths.add_argument('y', type=int)
+    paths.add_argument('--paths', default='paths.grid')
+    paths.set_defaults(run=run_paths)
+
+    locate = subparsers.add_parser('locate', help="List the generated locations at (or around) a map pixel.")
+    locate.add_argument('x', type=int)
+    locate.add_argument('y', type=int)
+    locate.add_argument('--locations', default='updated_locations_off_roads_tracks.csv')
+    locate.add_argument('--radius', type=float, help="Search radius in map pixels around the pixel centre.")
+    locate.set_defaults(run=run_locate)
+
+    serve = subparsers.add_parser('serve', help="Serve batched pixel queries over HTTP/JSON (see query_server.py).")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--locations', default='updated_locations_off_roads_tracks.csv')
+    serve.add_argument('--paths', default='paths.grid')
+    serve.add_argument('--dflocations', default='DFLocations.csv')
+    serve.add_argument('--climate-map', default='DFClimateMap.png')
+    serve.add_argument('--regions', default='Regions.gpkg')
+    serve.add_argument('--reload-interval', type=float, default=2.0, help="Seconds between input file checks.")
+    serve.set_defaults(run=run_serve)
+
+    validate = subparsers.add_parser('validate', help="Check the invariants of a locations output (see validate.py).")
+    validate.add_argument('--locations', default='updated_locations_off_roads_tracks.csv')
+    validate.add_argument('--paths', default='paths.grid')
+    validate.add_argument('--water-map', default='DFWaterMap.png')
+    validate.add_argument('--examples', type=int, default=5, help="Example locationIDs to print per failed check.")
+    validate.set_defaults(run=run_validate)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
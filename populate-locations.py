@@ -65,10 +65,11 @@ def main(locations_path, rules_path, output_path):
     updated_locations.to_csv(output_path, index=False)
     print("Update complete. File saved to", output_path)
 
-# Update these paths as needed
-locations_path = 'updated_locations.csv'
-rules_path = 'location_rules.csv'
-output_path = 'populated_locations.csv'
+if __name__ == "__main__":
+    # Update these paths as needed
+    locations_path = 'updated_locations.csv'
+    rules_path = 'location_rules.csv'
+    output_path = 'populated_locations.csv'
 
-main(locations_path, rules_path, output_path)
+    main(locations_path, rules_path, output_path)
 
@@ -0,0 +1,164 @@
+"""
+Binary catalog of the prefab definitions in prefabs/*.txt.
+
+Each prefab file is streamed with iterparse for its <width>/<height> and the
+posX/posZ of every <object>, and the results are stored in one .npz catalog
+(prefabs/prefab_catalog.npz by default) with per-prefab size, object count and
+object extents plus all object positions (CSR-style: the objects of prefab i
+are object_pos[object_offsets[i]:object_offsets[i + 1]]).
+
+Rebuilding is incremental: a prefab is only re-parsed when its mtime/size and
+its SHA-1 no longer match the catalog, and changed files are parsed on a
+process pool.
+"""
+import glob
+import hashlib
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+DEFAULT_PREFAB_DIR = 'prefabs'
+CATALOG_FILENAME = 'prefab_catalog.npz'
+
+def file_sha1(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+def parse_prefab(path):
+    """Stream one prefab file and return its size and object positions."""
+    width = height = None
+    positions = []
+    posX = posZ = None
+    for _, elem in ET.iterparse(path, events=('end',)):
+        if elem.tag == 'width':
+            width = int(elem.text)
+        elif elem.tag == 'height':
+            height = int(elem.text)
+        elif elem.tag == 'posX':
+            posX = float(elem.text)
+        elif elem.tag == 'posZ':
+            posZ = float(elem.text)
+        elif elem.tag == 'object':
+            positions.append((posX, posZ))
+            posX = posZ = None
+            elem.clear()  # Objects are done with once their position is read
+    return {
+        'width': -1 if width is None else width,
+        'height': -1 if height is None else height,
+        'positions': np.array(positions, dtype=np.float32).reshape(-1, 2),
+    }
+
+def catalog_to_entries(catalog):
+    """Split a loaded catalog back into per-prefab entries keyed by name."""
+    entries = {}
+    for i, name in enumerate(catalog['name']):
+        start, stop = catalog['object_offsets'][i], catalog['object_offsets'][i + 1]
+        entries[str(name)] = {
+            'width': int(catalog['width'][i]),
+            'height': int(catalog['height'][i]),
+            'positions': catalog['object_pos'][start:stop],
+            'mtime': float(catalog['mtime'][i]),
+            'size': int(catalog['size'][i]),
+            'sha1': str(catalog['sha1'][i]),
+        }
+    return entries
+
+def entries_to_catalog(entries):
+    """Pack per-prefab entries (sorted by name) into the catalog arrays."""
+    names = sorted(entries)
+    positions = [entries[name]['positions'] for name in names]
+    counts = np.array([len(p) for p in positions], dtype=np.int64)
+    object_pos = np.concatenate(positions) if names else np.zeros((0, 2), dtype=np.float32)
+
+    def extent(function, column):
+        # NaN for prefabs without objects
+        return np.array([function(p[:, column]) if len(p) else np.nan for p in positions], dtype=np.float32)
+
+    return {
+        'name': np.array(names, dtype=str),
+        'width': np.array([entries[name]['width'] for name in names], dtype=np.int16),
+        'height': np.array([entries[name]['height'] for name in names], dtype=np.int16),
+        'object_count': counts,
+        'min_x': extent(np.min, 0),
+        'max_x': extent(np.max, 0),
+        'min_z': extent(np.min, 1),
+        'max_z': extent(np.max, 1),
+        'object_offsets': np.concatenate([[0], np.cumsum(counts)]),
+        'object_pos': object_pos.astype(np.float32),
+        'mtime': np.array([entries[name]['mtime'] for name in names], dtype=np.float64),
+        'size': np.array([entries[name]['size'] for name in names], dtype=np.int64),
+        'sha1': np.array([entries[name]['sha1'] for name in names], dtype=str),
+    }
+
+def read_catalog(catalog_filename):
+    with np.load(catalog_filename) as catalog:
+        return {key: catalog[key] for key in catalog.files}
+
+def build_prefab_catalog(prefab_dir=DEFAULT_PREFAB_DIR, catalog_filename=None, max_workers=None):
+    """
+    Bring the catalog up to date with the prefab files, re-parsing only the
+    files that changed, and return it.
+    """
+    if not os.path.isdir(prefab_dir):
+        raise FileNotFoundError(f"Prefab directory not found: {prefab_dir}")
+    catalog_filename = catalog_filename or os.path.join(prefab_dir, CATALOG_FILENAME)
+    cached = catalog_to_entries(read_catalog(catalog_filename)) if os.path.exists(catalog_filename) else {}
+
+    entries = {}
+    changed = {}
+    touched = False
+    for path in sorted(glob.glob(os.path.join(prefab_dir, '*.txt'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        stat = os.stat(path)
+        entry = cached.get(name)
+        if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+            entries[name] = entry
+            continue
+        sha1 = file_sha1(path)
+        if entry and entry['sha1'] == sha1:
+            # Touched but not modified
+            entries[name] = dict(entry, mtime=stat.st_mtime, size=stat.st_size)
+            touched = True
+            continue
+        changed[name] = (path, {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha1': sha1})
+
+    if len(changed) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            parsed = executor.map(parse_prefab, [path for path, _ in changed.values()], chunksize=8)
+            parsed = list(parsed)
+    else:
+        parsed = [parse_prefab(path) for path, _ in changed.values()]
+    for (name, (_, file_info)), result in zip(changed.items(), parsed):
+        entries[name] = dict(result, **file_info)
+
+    catalog = entries_to_catalog(entries)
+    if changed or touched or set(entries) != set(cached):
+        np.savez(catalog_filename, **catalog)
+        print(f"Prefab catalog saved to {catalog_filename} ({len(changed)} of {len(entries)} prefabs parsed)")
+    return catalog
+
+def load_prefab_catalog(prefab_dir=DEFAULT_PREFAB_DIR, catalog_filename=None, update=True):
+    """Return the catalog, refreshing it from the prefab files first unless update is False."""
+    catalog_filename = catalog_filename or os.path.join(prefab_dir, CATALOG_FILENAME)
+    if update or not os.path.exists(catalog_filename):
+        return build_prefab_catalog(prefab_dir, catalog_filename)
+    return read_catalog(catalog_filename)
+
+def catalog_rows(catalog, prefabs):
+    """Catalog row of each prefab name, -1 where the prefab isn't in the catalog."""
+    prefabs = np.asarray(prefabs, dtype=str)
+    if len(catalog['name']) == 0:
+        return np.full(len(prefabs), -1)
+    rows = np.clip(np.searchsorted(catalog['name'], prefabs), 0, len(catalog['name']) - 1)
+    return np.where(catalog['name'][rows] == prefabs, rows, -1)
+
+def prefab_sizes(catalog, prefabs):
+    """(sizeX, sizeY) float arrays for the given prefab names, NaN where unknown."""
+    rows = catalog_rows(catalog, prefabs)
+    if len(catalog['name']) == 0:
+        return np.full(len(rows), np.nan), np.full(len(rows), np.nan)
+    known = (rows >= 0) & (catalog['width'][rows] >= 0)
+    sizeX = np.where(known, catalog['width'][rows], np.nan)
+    sizeY = np.where(known, catalog['height'][rows], np.nan)
+    return sizeX, sizeY
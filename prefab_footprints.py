@@ -0,0 +1,160 @@
+"""
+Exact prefab footprints for moving locations off roads and tracks.
+
+Each prefab's object positions (from the prefab catalog) are rasterized once
+into an occupancy mask in terrain units, centred on the location, and cached
+in prefabs/prefab_footprints.npz keyed by the prefab file's SHA-1. Prefabs
+with too few objects to describe their area (the block-based farms are a
+single object) fall back to their sizeX x sizeY rectangle.
+
+Locations are then placed in batch: for every (prefab, path bits) group the
+valid centres inside the 128x128 terrain tile are computed once, and each
+location takes the valid centre closest to where it started.
+"""
+import os
+from functools import lru_cache
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from path_geometry import DIRECTION_BITS, DIRECTION_STEPS, TERRAIN_SIZE
+
+# Metres of prefab object position per terrain unit
+TERRAIN_UNIT = 6.4
+# Terrain units around each object position counted as occupied
+OBJECT_RADIUS = 1
+# Prefabs with fewer objects than this use their full rectangle
+MIN_OBJECTS = 3
+# Half-width (terrain units) kept clear around every road/track segment
+PATH_CLEARANCE = 2
+FOOTPRINTS_FILENAME = 'prefab_footprints.npz'
+
+def rectangle_mask(sizeX, sizeY):
+    """Occupancy mask of a sizeX x sizeY rectangle, with odd dimensions so it has a centre cell."""
+    return np.ones((int(sizeY) // 2 * 2 + 1, int(sizeX) // 2 * 2 + 1), dtype=bool)
+
+def rasterize_footprint(positions, sizeX, sizeY):
+    """
+    Occupancy mask for a prefab, indexed [dy + R, dx + R] where (dx, dy) is the
+    offset from the location in terrain units and y grows to the north (posZ).
+    Returns None for prefabs with neither objects nor a size.
+    """
+    if len(positions) < MIN_OBJECTS:
+        # No usable footprint at all without a size either
+        return rectangle_mask(sizeX, sizeY) if sizeX > 0 and sizeY > 0 else None
+    cells = np.rint(np.asarray(positions, dtype=np.float64) / TERRAIN_UNIT).astype(np.int64)
+    radius = int(np.abs(cells).max()) + OBJECT_RADIUS
+    mask = np.zeros((2 * radius + 1, 2 * radius + 1), dtype=bool)
+    for dy in range(-OBJECT_RADIUS, OBJECT_RADIUS + 1):
+        for dx in range(-OBJECT_RADIUS, OBJECT_RADIUS + 1):
+            mask[cells[:, 1] + dy + radius, cells[:, 0] + dx + radius] = True
+    return mask
+
+def load_footprint_masks(catalog, prefab_dir='prefabs', cache_filename=None):
+    """
+    Return {prefab name: mask}, rasterizing only prefabs whose file changed
+    since the cache was written. Prefabs without a usable footprint are left out.
+    """
+    cache_filename = cache_filename or os.path.join(prefab_dir, FOOTPRINTS_FILENAME)
+    cached = {}
+    if os.path.exists(cache_filename):
+        with np.load(cache_filename) as cache:
+            for i, (name, sha1) in enumerate(zip(cache['name'], cache['sha1'])):
+                height, width = cache['shape'][i]
+                bits = cache['bits'][cache['offsets'][i]:cache['offsets'][i + 1]]
+                mask = np.unpackbits(bits, count=height * width).reshape(height, width).astype(bool)
+                cached[str(name)] = (str(sha1), mask)
+
+    masks = {}
+    sha1s = {}
+    rebuilt = 0
+    for i, name in enumerate(catalog['name']):
+        name = str(name)
+        sha1 = str(catalog['sha1'][i])
+        if name in cached and cached[name][0] == sha1:
+            masks[name] = cached[name][1]
+        else:
+            start, stop = catalog['object_offsets'][i], catalog['object_offsets'][i + 1]
+            mask = rasterize_footprint(catalog['object_pos'][start:stop], catalog['width'][i], catalog['height'][i])
+            rebuilt += 1
+            if mask is None:
+                continue
+            masks[name] = mask
+        sha1s[name] = sha1
+
+    if rebuilt or set(masks) != set(cached):
+        names = list(masks)
+        packed = [np.packbits(masks[name]) for name in names]
+        np.savez(cache_filename,
+                 name=np.array(names, dtype=str),
+                 sha1=np.array([sha1s[name] for name in names], dtype=str),
+                 shape=np.array([masks[name].shape for name in names], dtype=np.int64).reshape(-1, 2),
+                 offsets=np.concatenate([[0], np.cumsum([len(p) for p in packed])]).astype(np.int64),
+                 bits=np.concatenate(packed) if packed else np.zeros(0, dtype=np.uint8))
+    return masks
+
+@lru_cache(maxsize=256)
+def path_raster(bits, terrain_size=TERRAIN_SIZE):
+    """(128, 128) boolean raster, indexed [terrainY, terrainX], of the path segments in a path byte."""
+    tile_center = terrain_size // 2
+    raster = np.zeros((terrain_size, terrain_size), dtype=bool)
+    steps = np.linspace(0, tile_center, 4 * terrain_size)
+    offsets = np.arange(-PATH_CLEARANCE, PATH_CLEARANCE + 1)
+    for bit, (dx, dy) in zip(DIRECTION_BITS, DIRECTION_STEPS):
+        if bits & bit:
+            xs = np.rint(tile_center + dx * steps).astype(np.int64)
+            ys = np.rint(tile_center + dy * steps).astype(np.int64)
+            for oy in offsets:
+                for ox in offsets:
+                    inside = (xs + ox >= 0) & (xs + ox < terrain_size) & (ys + oy >= 0) & (ys + oy < terrain_size)
+                    raster[ys[inside] + oy, xs[inside] + ox] = True
+    raster.flags.writeable = False
+    return raster
+
+def valid_centers(mask, bits, terrain_size=TERRAIN_SIZE):
+    """Boolean (128, 128) map of the centres where the mask fits in the tile without touching a path."""
+    ry, rx = mask.shape[0] // 2, mask.shape[1] // 2
+    # Outside the tile counts as blocked, so the footprint must stay inside it
+    blocked = np.pad(path_raster(int(bits), terrain_size), ((ry, ry), (rx, rx)), constant_values=True)
+    windows = sliding_window_view(blocked, mask.shape)
+    overlap = np.tensordot(windows, mask, axes=([2, 3], [0, 1]))
+    return ~overlap.astype(bool)
+
+def nearest_valid(valid, terrainX, terrainY, chunk=512):
+    """Closest valid centre to each (terrainX, terrainY); -1 where no centre is valid."""
+    vy, vx = np.nonzero(valid)
+    newX = np.full(len(terrainX), -1, dtype=np.int64)
+    newY = np.full(len(terrainY), -1, dtype=np.int64)
+    if len(vx) == 0:
+        return newX, newY
+    for start in range(0, len(terrainX), chunk):
+        tx = terrainX[start:start + chunk, None]
+        ty = terrainY[start:start + chunk, None]
+        nearest = ((vx - tx) ** 2 + (vy - ty) ** 2).argmin(axis=1)
+        newX[start:start + chunk] = vx[nearest]
+        newY[start:start + chunk] = vy[nearest]
+    return newX, newY
+
+def place_footprints(prefabs, path_bits, terrainX, terrainY, masks, terrain_size=TERRAIN_SIZE):
+    """
+    Minimal displacement clearing every path segment for all locations at once.
+    Returns (newX, newY, placed); rows that are unknown prefabs or have no valid
+    centre keep their position and have placed == False.
+    """
+    prefabs = np.asarray(prefabs, dtype=str)
+    path_bits = np.asarray(path_bits, dtype=np.int64)
+    terrainX = np.asarray(terrainX, dtype=np.int64)
+    terrainY = np.asarray(terrainY, dtype=np.int64)
+    newX, newY = terrainX.copy(), terrainY.copy()
+    placed = np.isin(prefabs, list(masks))
+    # Locations without a path in their pixel stay put
+    todo = placed & (path_bits != 0)
+
+    groups = {}
+    for row in np.flatnonzero(todo):
+        groups.setdefault((prefabs[row], path_bits[row]), []).append(row)
+    for (prefab, bits), rows in groups.items():
+        rows = np.array(rows)
+        x, y = nearest_valid(valid_centers(masks[prefab], bits, terrain_size), terrainX[rows], terrainY[rows])
+        found = x >= 0
+        newX[rows[found]], newY[rows[found]] = x[found], y[found]
+        placed[rows[~found]] = False
+    return newX, newY, placed
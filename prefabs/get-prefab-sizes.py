@@ -1,32 +1,25 @@
-import pandas as pd
-import xml.etree.ElementTree as ET
 import os
+import sys
+import pandas as pd
+
+# The prefab catalog lives with the other shared modules one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from prefab_catalog import load_prefab_catalog, prefab_sizes
 
-# Step 1: Read the CSV file
-df = pd.read_csv('location_names.csv')
+def update_prefab_sizes(csv_filename='location_names.csv', prefab_dir='.'):
+    # Step 1: Read the CSV file
+    df = pd.read_csv(csv_filename)
 
-# New columns for sizeX and sizeY
-df['sizeX'] = None
-df['sizeY'] = None
+    # Step 2: Bring the prefab catalog up to date; only changed prefab files are parsed
+    catalog = load_prefab_catalog(prefab_dir)
 
-# Step 2: Iterate over each row in the DataFrame
-for index, row in df.iterrows():
-    prefab_name = row['prefab']
-    xml_filename = f'{prefab_name}.txt'
-    
-    # Check if the corresponding XML file exists
-    if os.path.exists(xml_filename):
-        # Step 3: Parse the XML file and extract the height and width
-        tree = ET.parse(xml_filename)
-        root = tree.getroot()
-        
-        height = root.find('height').text if root.find('height') is not None else None
-        width = root.find('width').text if root.find('width') is not None else None
-        
-        # Step 4: Update the DataFrame with sizeX and sizeY
-        df.at[index, 'sizeX'] = width
-        df.at[index, 'sizeY'] = height
+    # Step 3: Look up width and height for every prefab at once (empty where the prefab file is missing)
+    sizeX, sizeY = prefab_sizes(catalog, df['prefab'])
+    df['sizeX'] = pd.array(sizeX, dtype='Int64')
+    df['sizeY'] = pd.array(sizeY, dtype='Int64')
 
-# Step 5: Save the modified DataFrame to a new CSV file
-df.to_csv('location_names.csv', index=False)
+    # Step 4: Save the modified DataFrame to a new CSV file
+    df.to_csv(csv_filename, index=False)
 
+if __name__ == "__main__":
+    update_prefab_sizes()
@@ -0,0 +1,180 @@
+"""
+Fast raster previews of the world and of a generation run.
+
+Images are built as NumPy arrays and written with Image.fromarray, so a full
+1000x500 map with every layer renders in a fraction of a second. The layers,
+drawn in this order, are:
+
+    density      smoothed count of generated locations per map pixel
+    roads, tracks, rivers, streams
+                 map pixels holding a path in that layer of the path grid
+    dflocations  map pixels holding a DF location (from the DFLocations index)
+    locations    generated locations, coloured by location name
+
+Unlike map-dflocations.py, previews use the map grid orientation of the path
+grids and the generated locations: row = worldY, column = worldX.
+
+render_tile draws a window of map pixels at terrain resolution instead, with
+the path segments, each location at its terrainX/terrainY and, where the CSV
+has sizes, its sizeX x sizeY footprint.
+"""
+import zlib
+import numpy as np
+from PIL import Image
+from path_geometry import DIRECTION_BITS, DIRECTION_STEPS, TERRAIN_SIZE
+
+LAYER_ORDER = ['density', 'roads', 'tracks', 'rivers', 'streams', 'dflocations', 'locations']
+DEFAULT_LAYERS = ['roads', 'tracks', 'rivers', 'streams', 'dflocations', 'locations']
+PATH_LAYERS = {'roads': 'road', 'tracks': 'track', 'rivers': 'river', 'streams': 'stream'}
+LAYER_COLORS = {
+    'roads': (170, 60, 40),
+    'tracks': (120, 95, 60),
+    'rivers': (40, 80, 200),
+    'streams': (90, 150, 230),
+    'dflocations': (255, 255, 255),
+}
+DENSITY_RADIUS = 4
+
+def name_colors(names):
+    """Bright RGB colour per name, stable across runs (the hue comes from a CRC of the name)."""
+    names = np.asarray(names, dtype=str)
+    unique, inverse = np.unique(names, return_inverse=True)
+    hue = np.array([zlib.crc32(name.encode('utf-8')) / 0xFFFFFFFF for name in unique])
+    # HSV to RGB with saturation 0.75 and value 1
+    k = (np.array([5, 3, 1]) + hue[:, None] * 6) % 6
+    rgb = 1 - 0.75 * np.clip(np.minimum(k, 4 - k), 0, 1)
+    return (rgb * 255).astype(np.uint8)[inverse]
+
+def box_blur(grid, radius):
+    """Mean over a (2 * radius + 1) square window, via a summed-area table."""
+    padded = np.pad(grid.astype(np.float64), radius + 1)[:-1, :-1]
+    table = padded.cumsum(0).cumsum(1)
+    size = 2 * radius + 1
+    height, width = grid.shape
+    return (table[size:size + height, size:size + width] - table[:height, size:size + width]
+            - table[size:size + height, :width] + table[:height, :width]) / size ** 2
+
+def density_colors(counts):
+    """Black -> red -> yellow -> white ramp over counts scaled by their 99th percentile."""
+    positive = counts[counts > 0]
+    scale = np.percentile(positive, 99) if len(positive) else 1
+    t = np.clip(counts / scale, 0, 1)[..., None] * 3
+    return (np.clip(t - np.array([0, 1, 2]), 0, 1) * 255).astype(np.uint8)
+
+def load_preview_locations(csv_filename):
+    """The columns of a locations CSV the previews use."""
+    import pandas as pd
+    wanted = ['name', 'worldX', 'worldY', 'terrainX', 'terrainY', 'sizeX', 'sizeY']
+    df = pd.read_csv(csv_filename, usecols=lambda column: column in wanted)
+    if 'name' not in df.columns:
+        df['name'] = ''
+    return df
+
+def render_map(layers=DEFAULT_LAYERS, paths=None, dflocations=None, locations=None,
+               width=1000, height=500, density_radius=DENSITY_RADIUS):
+    """
+    (height, width, 3) uint8 preview of the requested layers. `paths` is the
+    layered path grid, `dflocations` the DFLocations index and `locations` a
+    DataFrame from load_preview_locations; each is only needed by its layers.
+    """
+    from path_grid import LAYERS
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    for layer in [layer for layer in LAYER_ORDER if layer in layers]:
+        if layer == 'density':
+            counts = np.zeros((height, width))
+            np.add.at(counts, (locations['worldY'].to_numpy(), locations['worldX'].to_numpy()), 1)
+            image[:] = density_colors(box_blur(counts, density_radius))
+        elif layer in PATH_LAYERS:
+            image[paths[..., LAYERS.index(PATH_LAYERS[layer])] != 0] = LAYER_COLORS[layer]
+        elif layer == 'dflocations':
+            image[dflocations['count'] > 0] = LAYER_COLORS[layer]
+        elif layer == 'locations':
+            image[locations['worldY'].to_numpy(), locations['worldX'].to_numpy()] = name_colors(locations['name'].fillna(''))
+    return image
+
+def terrain_to_tile(x, y, terrainX, terrainY, x0, y0, scale, terrain_size=TERRAIN_SIZE):
+    """Output pixel (column, row) in a tile of a terrain position, terrainY growing north."""
+    column = (x - x0) * scale + terrainX * scale / terrain_size
+    row = (y - y0) * scale + (terrain_size - terrainY) * scale / terrain_size
+    return column, row
+
+def plot(image, columns, rows, colors):
+    """Set the in-bounds points of (columns, rows) to colors (one colour or one per point)."""
+    columns = np.floor(columns).astype(np.int64)
+    rows = np.floor(rows).astype(np.int64)
+    inside = (columns >= 0) & (columns < image.shape[1]) & (rows >= 0) & (rows < image.shape[0])
+    colors = np.broadcast_to(np.asarray(colors, dtype=np.uint8), columns.shape + (3,))
+    image[rows[inside], columns[inside]] = colors[inside]
+
+def render_tile(x0, y0, x1, y1, scale=32, layers=DEFAULT_LAYERS, paths=None, dflocations=None, locations=None,
+                terrain_size=TERRAIN_SIZE):
+    """
+    Preview of the map pixels [x0, x1) x [y0, y1) at `scale` output pixels per
+    map pixel, drawn in terrain coordinates of a terrain_size tile.
+    """
+    tile_center = terrain_size / 2
+    from path_grid import LAYERS
+    image = np.zeros(((y1 - y0) * scale, (x1 - x0) * scale, 3), dtype=np.uint8)
+    if 'dflocations' in layers:
+        # DF locations shade their whole map pixel
+        shaded = np.kron(dflocations['count'][y0:y1, x0:x1] > 0, np.ones((scale, scale), dtype=bool))
+        image[shaded] = 64
+
+    # Every path segment as points sampled from the tile centre to the edge
+    steps = np.linspace(0, tile_center, 2 * scale)
+    for layer in [layer for layer in LAYER_ORDER if layer in PATH_LAYERS and layer in layers]:
+        bits = paths[y0:y1, x0:x1, LAYERS.index(PATH_LAYERS[layer])]
+        ys, xs, directions = np.nonzero((bits[..., None] & DIRECTION_BITS) != 0)
+        terrainX = tile_center + DIRECTION_STEPS[directions, 0][:, None] * steps
+        terrainY = tile_center + DIRECTION_STEPS[directions, 1][:, None] * steps
+        columns, rows = terrain_to_tile((xs + x0)[:, None], (ys + y0)[:, None], terrainX, terrainY, x0, y0, scale,
+                                        terrain_size)
+        plot(image, columns, rows, LAYER_COLORS[layer])
+
+    if 'locations' in layers and locations is not None:
+        inside = locations['worldX'].between(x0, x1 - 1) & locations['worldY'].between(y0, y1 - 1)
+        tile = locations[inside]
+        colors = name_colors(tile['name'].fillna(''))[:, None]
+        x, y = tile['worldX'].to_numpy()[:, None], tile['worldY'].to_numpy()[:, None]
+        terrainX, terrainY = tile['terrainX'].to_numpy()[:, None], tile['terrainY'].to_numpy()[:, None]
+        if 'sizeX' in tile.columns:
+            # Footprint outline, walked as points around the rectangle
+            halfX = tile['sizeX'].fillna(0).to_numpy()[:, None] / 2
+            halfY = tile['sizeY'].fillna(0).to_numpy()[:, None] / 2
+            t = np.linspace(-1, 1, 2 * scale)
+            outlineX = np.concatenate([terrainX + halfX * t, terrainX + halfX * t, terrainX - halfX + 0 * t, terrainX + halfX + 0 * t], axis=1)
+            outlineY = np.concatenate([terrainY - halfY + 0 * t, terrainY + halfY + 0 * t, terrainY + halfY * t, terrainY + halfY * t], axis=1)
+            columns, rows = terrain_to_tile(x, y, outlineX, outlineY, x0, y0, scale, terrain_size)
+            plot(image, columns, rows, colors)
+        # A small square on the location itself
+        offsets = np.array([-1, 0, 1])
+        column, row = terrain_to_tile(x, y, terrainX, terrainY, x0, y0, scale, terrain_size)
+        columns = column + np.repeat(offsets, 3)[None, :]
+        rows = row + np.tile(offsets, 3)[None, :]
+        plot(image, columns, rows, colors)
+    return image
+
+def render_preview(output_file, layers=DEFAULT_LAYERS, filenames=None, tile=None, scale=32, spec=None):
+    """
+    Load only the inputs the layers need (see world_assets.py), render the full
+    map or, given tile = (x0, y0, x1, y1), one zoomed tile, and save it.
+    """
+    from world_assets import ASSET_FILES, load_world_assets
+    from world_spec import load_world_spec
+    spec = spec or load_world_spec()
+    files = dict(ASSET_FILES, locations='updated_locations_off_roads_tracks.csv')
+    files.update(filenames or {})
+    names = []
+    if any(layer in PATH_LAYERS for layer in layers):
+        names.append('paths')
+    if 'dflocations' in layers:
+        names.append('dflocations')
+    assets = load_world_assets(names, files, spec=spec) if names else {}
+    if 'locations' in layers or 'density' in layers:
+        assets['locations'] = load_preview_locations(files['locations'])
+
+    if tile:
+        image = render_tile(*tile, scale=scale, layers=layers, terrain_size=spec['terrain_size'], **assets)
+    else:
+        image = render_map(layers, width=spec['width'], height=spec['height'], **assets)
+    Image.fromarray(image, 'RGB').save(output_file)
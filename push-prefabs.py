@@ -2,6 +2,7 @@ import csv
 import pandas as pd
 import random
 import numpy as np
+from world_spec import DEFAULT_WORLD_SPEC, load_world_spec
 
 direction_offsets = {
     'N': (0, 1),
@@ -101,7 +102,7 @@ def calculate_displacement_for_diagonal_clearance(sizeX, sizeY):
     buffer = 2  # Additional buffer for safety
     return (diagonal_clearance / 2) + buffer
 
-def move_off_road_track_center(roads_tracks, sizeX, sizeY, locationID):
+def move_off_road_track_center(roads_tracks, sizeX, sizeY, locationID, tile_center=64):
     sizeX += 2  # Adding buffer
     sizeY += 2  # Adding buffer
 
@@ -147,15 +148,16 @@ def move_off_road_track_center(roads_tracks, sizeX, sizeY, locationID):
         displacementY = dy * displacement
 
     # Calculate new position considering the displacement
-    new_x = 64 + displacementX
-    new_y = 64 + displacementY
+    new_x = tile_center + displacementX
+    new_y = tile_center + displacementY
     
     return round(new_x), round(new_y)
 
-def move_off_road_track_general(row):
+def move_off_road_track_general(row, terrain_size=128, water_paths=""):
     """
     Adjusts the location off roads or tracks using only cardinal directions. It takes into account
     diagonal roads by ensuring movement is in a direction that clears the location from such roads.
+    water_paths are the river/stream directions crossing the footprint, avoided the same way.
     """
     sizeX, sizeY = row['sizeX'] + 2, row['sizeY'] + 2  # Adjust sizes for buffer
 
@@ -163,6 +165,8 @@ def move_off_road_track_general(row):
     roads = str(row['roads']) if pd.notnull(row['roads']) else ""
     tracks = str(row['tracks']) if pd.notnull(row['tracks']) else ""
     directions = roads.split('|') + tracks.split('|')
+    if water_paths:
+        directions += water_paths.split('|')
 
     # Get available cardinal directions excluding those blocked by roads/tracks
     available_directions = get_opposite_directions(directions)
@@ -193,38 +197,121 @@ def move_off_road_track_general(row):
         displacementY *= dy
 
     # Apply the displacement to the location's coordinates
-    new_x = min(max(row['terrainX'] + displacementX, sizeX / 2.0), 128 - sizeX / 2.0)
-    new_y = min(max(row['terrainY'] + displacementY, sizeY / 2.0), 128 - sizeY / 2.0)
+    new_x = min(max(row['terrainX'] + displacementX, sizeX / 2.0), terrain_size - sizeX / 2.0)
+    new_y = min(max(row['terrainY'] + displacementY, sizeY / 2.0), terrain_size - sizeY / 2.0)
     
     return round(new_x), round(new_y)
 
 
-def move_off_road_track(row):
+def move_off_road_track(row, spec=DEFAULT_WORLD_SPEC):
     roads = str(row['roads']) if pd.notnull(row['roads']) else ""
     tracks = str(row['tracks']) if pd.notnull(row['tracks']) else ""
+    # River and stream segments crossing the footprint (see find_water_paths) are avoided like roads and tracks
+    water_paths = row.get('water_paths', "")
+    water_paths = str(water_paths) if pd.notnull(water_paths) else ""
+    obstacles = '|'.join(d for d in [tracks, water_paths] if d)
     
-    # Only proceed if the location is actually affected by roads or tracks
-    if is_affected_by_road_track(roads, tracks):
-        if row['terrainX'] == 64 and row['terrainY'] == 64:
+    # Only proceed if the location is actually affected by roads, tracks or water paths
+    if is_affected_by_road_track(roads, obstacles):
+        center = spec['tile_center']
+        if row['terrainX'] == center and row['terrainY'] == center:
             # For center locations, only move if roads or tracks information is actually present
-            if roads.strip() or tracks.strip():
-                return move_off_road_track_center(roads + '|' + tracks, row['sizeX'], row['sizeY'], row['locationID'])
+            if roads.strip() or obstacles.strip():
+                return move_off_road_track_center(roads + '|' + obstacles, row['sizeX'], row['sizeY'], row['locationID'], center)
             else:
-                return 64, 64
+                return center, center
         else:
-            return move_off_road_track_general(row)
+            return move_off_road_track_general(row, spec['terrain_size'], water_paths)
     else:
         # If not affected by roads or tracks, return the current coordinates unchanged
         return row['terrainX'], row['terrainY']
 
-# Read CSV
-df = pd.read_csv('updated_populated_locations.csv')
+def find_water_paths(df, path_grid_filename, spec=DEFAULT_WORLD_SPEC):
+    """
+    For every location, the river/stream directions whose segments cross its footprint,
+    as pipe-separated strings. Computed for all rows at once.
+    """
+    from path_grid import load_path_grid, path_bits
+    from path_geometry import footprint_crossings, DIRECTION_BITS, bits_to_strings
+
+    paths = load_path_grid(path_grid_filename, width=spec['width'])
+    xs = df['worldX'].to_numpy(dtype=np.int64)
+    ys = df['worldY'].to_numpy(dtype=np.int64)
+    water_paths = path_bits(paths, xs, ys, ['river', 'stream'])
+    crossings = footprint_crossings(water_paths, df['terrainX'], df['terrainY'],
+                                    df['sizeX'].fillna(0), df['sizeY'].fillna(0), buffer=1, tile_center=spec['tile_center'])
+    crossing_bits = (crossings * DIRECTION_BITS).sum(axis=1)
+    return bits_to_strings(crossing_bits)
+
+def vector_bits(vectors):
+    """Path byte for each pipe-separated direction string (e.g. roads_vector) in a column."""
+    from path_geometry import direction_bits
+    vectors = vectors.fillna('').astype(str)
+    lookup = {vector: direction_bits(vector.split('|')) for vector in vectors.unique()}
+    return vectors.map(lookup).to_numpy(dtype=np.int64)
+
+def place_exact_footprints(df, prefab_dir, path_grid_filename=None, spec=DEFAULT_WORLD_SPEC):
+    """
+    Place every location with a known prefab at the nearest position where its
+    rasterized object footprint clears all road/track segments of its map pixel
+    (and river/stream segments if a path grid is given). Returns (newX, newY, placed).
+    """
+    from prefab_catalog import load_prefab_catalog
+    from prefab_footprints import load_footprint_masks, place_footprints
+
+    masks = load_footprint_masks(load_prefab_catalog(prefab_dir), prefab_dir)
+    bits = vector_bits(df['roads_vector']) | vector_bits(df['tracks_vector'])
+    if path_grid_filename:
+        from path_grid import load_path_grid, path_bits
+        xs = df['worldX'].to_numpy(dtype=np.int64)
+        ys = df['worldY'].to_numpy(dtype=np.int64)
+        bits |= path_bits(load_path_grid(path_grid_filename, width=spec['width']), xs, ys, ['river', 'stream'])
+    return place_footprints(df['prefab'].astype(str), bits, df['terrainX'], df['terrainY'], masks, spec['terrain_size'])
+
+def push_prefabs(input_path, output_path, path_grid_filename=None, prefab_dir=None, exact_footprints=False, spec=None):
+    """
+    Pass the layered path grid (see path_grid.py) to also move locations off
+    rivers and streams; the output then gets a water_paths column with the
+    directions each location still crosses after moving. Pass prefab_dir to
+    fill missing sizes from the prefab catalog.
+    exact_footprints moves locations by their rasterized prefab objects instead of
+    the sizeX x sizeY rectangle; locations it can't place fall back to the rectangle.
+    """
+    spec = spec or load_world_spec()
+    # Read CSV
+    df = pd.read_csv(input_path)
+
+    if prefab_dir:
+        from prefab_catalog import load_prefab_catalog, prefab_sizes
+        sizeX, sizeY = prefab_sizes(load_prefab_catalog(prefab_dir), df['prefab'].astype(str))
+        df['sizeX'] = df['sizeX'].fillna(pd.Series(sizeX, index=df.index))
+        df['sizeY'] = df['sizeY'].fillna(pd.Series(sizeY, index=df.index))
+
+    if path_grid_filename:
+        df['water_paths'] = find_water_paths(df, path_grid_filename, spec)
+
+    placed = np.zeros(len(df), dtype=bool)
+    if exact_footprints:
+        newX, newY, placed = place_exact_footprints(df, prefab_dir or 'prefabs', path_grid_filename, spec)
+
+    # Apply the function to move locations off roads/tracks
+    if not placed.all():
+        df.loc[~placed, ['terrainX', 'terrainY']] = df[~placed].apply(lambda row: move_off_road_track(row, spec), axis=1, result_type='expand').to_numpy()
+    if placed.any():
+        df.loc[placed, 'terrainX'] = newX[placed]
+        df.loc[placed, 'terrainY'] = newY[placed]
+    if path_grid_filename:
+        # Check the new positions: water_paths keeps the river/stream directions a location still crosses
+        df['water_paths'] = find_water_paths(df, path_grid_filename, spec)
+        crossing = (df['water_paths'] != '').sum()
+        if crossing:
+            print(f"{crossing} locations still cross a river or stream (see the water_paths column)")
 
-# Apply the function to move locations off roads/tracks
-df[['terrainX', 'terrainY']] = df.apply(lambda row: move_off_road_track(row), axis=1, result_type='expand')
+    # Save to a new CSV file
+    df.to_csv(output_path, index=False)
 
-# Save to a new CSV file
-df.to_csv('updated_locations_off_roads_tracks.csv', index=False)
+    print(f"Locations have been updated and saved to '{output_path}'.")
 
-print("Locations have been updated and saved to 'updated_locations_off_roads_tracks.csv'.")
+if __name__ == "__main__":
+    push_prefabs('updated_populated_locations.csv', 'updated_locations_off_roads_tracks.csv')
 
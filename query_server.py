@@ -0,0 +1,226 @@
+"""
+Local HTTP/JSON query service over the generated world.
+
+The path grid, climate map, region raster, DFLocations index and the index
+over the generated locations are loaded once (see world_assets.py) and kept in
+memory, so a question about any number of pixels is a handful of array
+gathers instead of a fresh Python start and a full asset load. The input files
+are polled for changes and only the assets whose files changed are reloaded,
+off the event loop, then swapped in between requests.
+
+Endpoints (all responses are JSON):
+    GET  /health                      loaded assets and the number of locations
+    GET  /pixel?x=..&y=..             everything known about one map pixel
+    GET  /radius?x=..&y=..&r=..       generated locations within r map pixels
+    POST /query  {"pixels": [[x, y], ...]}
+                                      /pixel for every listed pixel, in order
+
+Run with `python pipeline.py serve`.
+"""
+import asyncio
+import json
+import os
+import struct
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+from climate_map import climate_codes
+from world_assets import ASSET_FILES, load_world_assets
+
+ASSETS = ['paths', 'climate', 'region_raster', 'dflocations', 'locations']
+RELOAD_INTERVAL = 2.0
+MAX_BODY = 16 * 1024 * 1024
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+def watched_files(name, filename):
+    """Files whose change means the asset has to be reloaded."""
+    if name == 'paths':
+        from path_grid import path_grid_sources
+        try:
+            # Only the .bytes files the grid was built from (recorded in its header)
+            return [filename] + sorted(path_grid_sources(filename).values())
+        except (ValueError, struct.error):
+            return [filename]  # Being rewritten; its mtime still changes
+    return [filename]
+
+def file_stamps(files):
+    """mtime of every watched file of every asset (None while a file is missing)."""
+    return {name: tuple(os.path.getmtime(path) if os.path.exists(path) else None
+                        for path in watched_files(name, filename))
+            for name, filename in files.items()}
+
+def load_state(files, names=ASSETS, previous=None, spec=None):
+    """Load the named assets (keeping the rest from `previous`) into a new state dict."""
+    state = dict(previous or {})
+    state.update(load_world_assets(names, files, spec=spec))
+    if 'climate' in names:
+        state['climate_code'], state['climate_names'] = climate_codes(state['climate'])
+    state['stamps'] = file_stamps(files)
+    return state
+
+def query_pixels(state, xs, ys):
+    """
+    Paths, climate, region, DF locations and generated locations for each map pixel (x, y).
+    df_locationtype/df_dungeontype are the types add-loc-data.py records (the last DF
+    location listed for the pixel); df_locations lists every DF location on it.
+    """
+    from df_index import locations_at_pixels, types_at
+    from location_index import concat_ranges, pixel_ranges, records
+    from path_grid import LAYERS
+    from path_geometry import bits_to_strings
+
+    bits = state['paths'][ys, xs]
+    climates = state['climate_names'][state['climate_code'][ys, xs]]
+    regions = state['region_raster']['region_names'][state['region_raster']['region'][ys, xs]]
+    df_locationtypes, df_dungeontypes = types_at(state['dflocations'], xs, ys)
+    df_locations = locations_at_pixels(state['dflocations'], xs, ys)
+    starts, stops = pixel_ranges(state['locations'], xs, ys)
+    found = records(state['locations'], concat_ranges(starts, stops))
+    bounds = np.concatenate([[0], np.cumsum(stops - starts)])
+
+    results = []
+    for i, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+        results.append({
+            'x': x,
+            'y': y,
+            'paths': {layer: bits_to_strings(int(bits[i, j])) for j, layer in enumerate(LAYERS)},
+            'climate': str(climates[i]),
+            'region': str(regions[i]),
+            'df_locationtype': str(df_locationtypes[i]),
+            'df_dungeontype': str(df_dungeontypes[i]),
+            'df_locations': [{'locationtype': locationtype, 'dungeontype': dungeontype}
+                             for locationtype, dungeontype in df_locations[i]],
+            'locations': location_list(found, range(bounds[i], bounds[i + 1])),
+        })
+    return results
+
+def location_list(found, positions):
+    return [{column: values[p].item() for column, values in found.items()} for p in positions]
+
+def query_radius(state, x, y, radius):
+    from location_index import locations_in_radius, records
+    positions = locations_in_radius(state['locations'], x, y, radius)
+    return location_list(records(state['locations'], positions), range(len(positions)))
+
+def pixel_arrays(state, pixels):
+    """Validate a list of [x, y] pairs and return them as index arrays."""
+    array = np.asarray(pixels, dtype=np.int64).reshape(-1, 2)
+    height, width = state['paths'].shape[:2]
+    inside = (array[:, 0] >= 0) & (array[:, 0] < width) & (array[:, 1] >= 0) & (array[:, 1] < height)
+    if not inside.all():
+        raise ValueError(f"pixel {array[~inside][0].tolist()} is outside the {width}x{height} map")
+    return array[:, 0], array[:, 1]
+
+def handle(state, method, path, body):
+    """Answer one request; returns (status, JSON-serialisable payload)."""
+    url = urlsplit(path)
+    params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+    try:
+        if url.path == '/health':
+            return 200, {'assets': sorted(name for name in ASSETS if name in state),
+                         'locations': int(len(state['locations']['row']))}
+        if url.path == '/pixel':
+            xs, ys = pixel_arrays(state, [[int(params['x']), int(params['y'])]])
+            return 200, query_pixels(state, xs, ys)[0]
+        if url.path == '/radius':
+            return 200, query_radius(state, float(params['x']), float(params['y']), float(params['r']))
+        if url.path == '/query':
+            if method != 'POST':
+                return 405, {'error': "POST a JSON body {\"pixels\": [[x, y], ...]}"}
+            xs, ys = pixel_arrays(state, json.loads(body or b'{}').get('pixels', []))
+            return 200, query_pixels(state, xs, ys)
+    except (KeyError, ValueError, TypeError, AttributeError) as error:
+        return 400, {'error': f"{type(error).__name__}: {error}"}
+    return 404, {'error': f"unknown endpoint {url.path}"}
+
+async def read_request(reader):
+    """Parse one HTTP/1.1 request; returns (method, path, headers, body) or None at EOF."""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, _ = line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY:
+        raise OverflowError(length)
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+def write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode('utf-8')
+    writer.write((f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                  f"Content-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n"
+                  f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode('latin-1') + body)
+
+async def serve_connection(server, reader, writer):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except OverflowError:
+                write_response(writer, 413, {'error': "request body too large"}, False)
+                break
+            except (ValueError, asyncio.IncompleteReadError):
+                write_response(writer, 400, {'error': "malformed request"}, False)
+                break
+            if request is None:
+                break
+            method, path, headers, body = request
+            keep_alive = headers.get('connection', '').lower() != 'close'
+            try:
+                # The state is swapped whole on reload, so a request only ever sees one version
+                status, payload = handle(server['state'], method, path, body)
+            except Exception as error:
+                status, payload = 500, {'error': f"{type(error).__name__}: {error}"}
+            write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def watch_files(server, interval=RELOAD_INTERVAL):
+    """Poll the input files and reload the assets whose files changed."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        stamps = file_stamps(server['files'])
+        changed = [name for name in ASSETS if stamps[name] != server['state']['stamps'][name]]
+        if not changed:
+            continue
+        try:
+            state = await loop.run_in_executor(None, load_state, server['files'], changed, server['state'],
+                                               server['spec'])
+        except Exception as error:
+            # Keep answering from the old state; a half-written file is retried on the next poll
+            print(f"Reloading {', '.join(changed)} failed ({error}), keeping the previous data")
+            continue
+        server['state'] = state
+        print(f"Reloaded {', '.join(changed)}")
+
+async def run_server(files, host='127.0.0.1', port=8765, interval=RELOAD_INTERVAL, spec=None):
+    loop = asyncio.get_running_loop()
+    server = {'files': files, 'spec': spec}
+    server['state'] = await loop.run_in_executor(None, load_state, files, ASSETS, None, spec)
+    listener = await asyncio.start_server(lambda r, w: serve_connection(server, r, w), host, port)
+    print(f"Serving {len(server['state']['locations']['row'])} locations on http://{host}:{port}")
+    async with listener:
+        await asyncio.gather(listener.serve_forever(), watch_files(server, interval))
+
+def serve(filenames=None, host='127.0.0.1', port=8765, interval=RELOAD_INTERVAL, spec=None):
+    """Load the assets (ASSET_FILES, overridden by `filenames`) and serve them until interrupted."""
+    files = {name: ASSET_FILES[name] for name in ASSETS}
+    files.update(filenames or {})
+    try:
+        asyncio.run(run_server(files, host, port, interval, spec))
+    except KeyboardInterrupt:
+        pass
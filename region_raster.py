@@ -0,0 +1,42 @@
+"""
+Region of every map pixel, rasterized once from Regions.gpkg.
+
+The region polygons are in GIS coordinates (x = worldX, y = -worldY), the
+same space as gisX/gisY, so each map pixel's centre is joined against them
+once and the result is kept as a (height, width) uint8 code grid plus the
+region names (code 0 is '' for pixels outside every region). The grid is
+cached next to the GeoPackage (see npz_cache.py).
+"""
+import os
+import numpy as np
+from npz_cache import load_cached_npz
+
+def raster_cache_filename(gpkg_filename):
+    return os.path.splitext(gpkg_filename)[0] + '.raster.npz'
+
+def build_region_raster(regions_gdf, width=1000, height=500):
+    """Join every map pixel centre against the region polygons."""
+    import geopandas as gpd
+    ys, xs = np.mgrid[0:height, 0:width]
+    centres = gpd.GeoDataFrame(geometry=gpd.points_from_xy(xs.ravel() + 0.5, -(ys.ravel() + 0.5)),
+                               crs=regions_gdf.crs)
+    joined = gpd.sjoin(centres, regions_gdf[['region', 'geometry']], how='inner', predicate='intersects')
+    # Pixels on a shared border keep the first region they matched
+    joined = joined[~joined.index.duplicated(keep='first')]
+
+    names = np.concatenate([[''], np.unique(regions_gdf['region'].to_numpy(dtype=str))])
+    codes = np.zeros(width * height, dtype=np.uint8)
+    codes[joined.index.to_numpy()] = np.searchsorted(names[1:], joined['region'].astype(str).to_numpy()) + 1
+    return {'region': codes.reshape(height, width), 'region_names': names}
+
+def load_region_raster(gpkg_filename, width=1000, height=500, cache_filename=None):
+    """Load the region grid from its cache, rebuilding it if the GeoPackage has changed."""
+    def build():
+        import geopandas as gpd
+        return build_region_raster(gpd.read_file(gpkg_filename), width, height)
+    return load_cached_npz(gpkg_filename, cache_filename or raster_cache_filename(gpkg_filename), build,
+                           lambda raster: raster['region'].shape == (height, width), "region raster")
+
+def regions_at(raster, xs, ys):
+    """Region name of each map pixel (x, y), '' outside every region."""
+    return raster['region_names'][raster['region'][ys, xs]]
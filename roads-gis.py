@@ -1,6 +1,7 @@
 import geopandas as gpd
 from shapely.geometry import LineString, MultiLineString
 from shapely.affinity import affine_transform
+from world_spec import load_world_spec
 
 def read_bytes_file(filename):
     with open(filename, 'rb') as file:
@@ -72,11 +73,11 @@ def transform_geometries(gdf):
     transformed_gdf['geometry'] = transformed_gdf['geometry'].apply(lambda geom: affine_transform(geom, [1, 0, 0, -1, 0.5, -0.5]))
     return transformed_gdf
 
-# Main execution starts here
-if __name__ == "__main__":
-    road_data = read_bytes_file('roadData.bytes')
-    track_data = read_bytes_file('trackData.bytes')
-    width, height = 1000, 500
+def export_path_geometries(road_data_filename, track_data_filename, road_output_filename, track_output_filename, spec=None):
+    road_data = read_bytes_file(road_data_filename)
+    track_data = read_bytes_file(track_data_filename)
+    spec = spec or load_world_spec()
+    width, height = spec['width'], spec['height']
 
     road_lines = []
     track_lines = []
@@ -95,8 +96,12 @@ if __name__ == "__main__":
     transformed_track_gdf = transform_geometries(track_gdf)
 
     # Save the transformed geometries to separate GeoPackage files
-    transformed_road_gdf.to_file("transformed_roads.gpkg", driver="GPKG")
-    transformed_track_gdf.to_file("transformed_tracks.gpkg", driver="GPKG")
+    transformed_road_gdf.to_file(road_output_filename, driver="GPKG")
+    transformed_track_gdf.to_file(track_output_filename, driver="GPKG")
+
+    print(f"Transformed GeoPackage files '{road_output_filename}' and '{track_output_filename}' have been created.")
 
-    print("Transformed GeoPackage files 'transformed_roads.gpkg' and 'transformed_tracks.gpkg' have been created.")
+# Main execution starts here
+if __name__ == "__main__":
+    export_path_geometries('roadData.bytes', 'trackData.bytes', 'transformed_roads.gpkg', 'transformed_tracks.gpkg')
 
@@ -0,0 +1,110 @@
+"""
+Sparse generation: the locations the dense loop of generate-locations.py would
+produce, drawn without visiting every map pixel.
+
+build_generation_context precomputes the eligible sub-cells once per world;
+sample_sparse_locations draws one set of locations from it per set of chances,
+which is all the generation sweep (location_sweep.py) repeats per run.
+"""
+import numpy as np
+from path_grid import LAYERS
+from water_checks import crosses_water_paths, is_center_water_pixel, water_path_bits
+from world_spec import DEFAULT_WORLD_SPEC, check_grid_shape
+
+def calculate_scaling_grid(heatmap):
+    """Heatmap scaling factor of every map pixel at once, as a (height, width) array."""
+    baseline_brightness = (132 + 134 + 131) / 3  # Brightness of the color #848683
+    pixel_brightness = heatmap[..., :3].astype(np.int64).sum(axis=-1) / 3  # Average of R, G, B values
+    # Inverting the scaling effect, avoiding division by zero
+    scaling_factor = baseline_brightness / np.maximum(pixel_brightness, 1)
+    # Limit the scaling factor to prevent extreme values
+    return np.clip(scaling_factor, 1.0, 4.0)
+
+def build_generation_context(paths, exclusions, town_exclusions, water_map, heatmap, avoid_water_paths=False,
+                             spec=DEFAULT_WORLD_SPEC, footprint=None):
+    """
+    Precompute everything the sparse generator needs that doesn't depend on the chances.
+
+    Builds the eligible sub-cells first (cell center not water, pixel not a town,
+    optionally `footprint` clear of rivers/streams) and turns them into the same
+    trials the dense loop rolls dice for: 'road' (road centers, and every non-center
+    sub-cell of a DF location pixel), 'track' and 'wilderness' (non-center sub-cells of
+    pixels with and without a road/track). Each kind is grouped by heatmap scaling
+    factor, since every trial in a group has the same chance.
+    """
+    check_grid_shape(spec, paths.shape, "The path grid")
+    height, width = paths.shape[:2]
+    subcells = spec['subcells']
+    per_pixel = subcells * subcells
+    coords = spec['subcell_coords']
+    bits = paths[..., LAYERS.index('road')] | paths[..., LAYERS.index('track')]
+
+    # Water test at every sub-cell center at once, rearranged to [y, x, iy, ix]
+    water = is_center_water_pixel(np.arange(width * subcells)[None, :], np.arange(height * subcells)[:, None],
+                                  water_map, spec)
+    water = water.reshape(height, subcells, width, subcells).transpose(0, 2, 1, 3)
+    eligible = ~water & ~town_exclusions[:, :, None, None]
+
+    if avoid_water_paths:
+        water_paths = water_path_bits(paths)
+        # Only pixels with a river or stream need the footprint test, at every sub-cell
+        ys, xs = np.nonzero(water_paths)
+        iy, ix = np.divmod(np.tile(np.arange(per_pixel), len(xs)), subcells)
+        ys, xs = ys.repeat(per_pixel), xs.repeat(per_pixel)
+        crossing = crosses_water_paths(water_paths, xs, ys, coords[ix], coords[iy], footprint, spec)
+        eligible[ys[crossing], xs[crossing], iy[crossing], ix[crossing]] = False
+
+    df = exclusions[:, :, None, None]
+    has_path = (bits != 0)[:, :, None, None]
+    on_path = (bits[:, :, None, None] & spec['subcell_path_bits']) != 0
+    not_center = np.ones((subcells, subcells), dtype=bool)
+    not_center[spec['center_subcell'], spec['center_subcell']] = False
+    kinds = {
+        'road': eligible & ((df & not_center) | (~df & on_path)),
+        'track': eligible & ~df & not_center & has_path,
+        'wilderness': eligible & ~df & not_center & ~has_path,
+    }
+
+    scaling = calculate_scaling_grid(heatmap).reshape(-1)
+    trials = {}
+    for kind, mask in kinds.items():
+        # Flat index into [y, x, iy, ix]; trial // per_pixel is the map pixel
+        kind_trials = np.flatnonzero(mask)
+        trial_scaling = scaling[kind_trials // per_pixel]
+        order = np.argsort(trial_scaling, kind='stable')
+        scales, counts = np.unique(trial_scaling[order], return_counts=True)
+        trials[kind] = {
+            'trials': kind_trials[order],
+            'scales': scales,
+            'offsets': np.concatenate([[0], np.cumsum(counts)]),
+        }
+    return {'width': width, 'height': height, 'subcells': subcells, 'subcell_coords': coords, 'trials': trials}
+
+def sample_sparse_locations(context, chances, rng, use_heatmap=True):
+    """
+    Draw locations from a generation context. For every group of trials sharing
+    a chance the number of hits is drawn from the binomial distribution and that
+    many trials are picked, so the work scales with the number of groups and
+    locations rather than with the map area. `chances` maps each trial kind to
+    its 1-in-N chance. Returns (xs, ys, terrainXs, terrainYs) arrays.
+    """
+    kinds = list(context['trials'])
+    selected = []
+    for rank, kind in enumerate(kinds):
+        group = context['trials'][kind]
+        if use_heatmap:
+            bounds = zip(group['scales'], group['offsets'][:-1], group['offsets'][1:])
+        else:
+            bounds = [(1.0, 0, len(group['trials']))]
+        for scale, start, stop in bounds:
+            adjusted_chance = max(1, int(chances[kind] * scale))  # Same rounding as should_generate_location in generate-locations.py
+            count = rng.binomial(stop - start, 1 / adjusted_chance)
+            picked = group['trials'][start + rng.choice(stop - start, count, replace=False)]
+            selected.append(picked * len(kinds) + rank)
+
+    # Sort by map pixel, then sub-cell, then trial kind, like the row order of the dense loop
+    selected = np.sort(np.concatenate(selected)) // len(kinds)
+    pixel, subcell = np.divmod(selected, context['subcells'] ** 2)
+    ys, xs = np.divmod(pixel, context['width'])
+    iy, ix = np.divmod(subcell, context['subcells'])
+    return xs, ys, context['subcell_coords'][ix], context['subcell_coords'][iy]
@@ -0,0 +1,173 @@
+"""
+Binary counterpart of splitallcsv.py: one fixed-record file per region that
+the mod can memory-map and query by map pixel without parsing text.
+
+File layout (little endian):
+    header      HEADER_SIZE bytes, see HEADER_FORMAT
+    records     record_count x RECORD_DTYPE, sorted by (worldY, worldX, locationID)
+    pixels      pixel_count x PIXEL_DTYPE, sorted by key = worldY << 16 | worldX;
+                the records of a pixel are records[start:start + count]
+    strings     string_count + 1 uint32 offsets into the UTF-8 blob that follows;
+                name and prefab in a record are indices into this table
+
+Looking up a map pixel is a binary search of the pixel keys followed by one
+contiguous read of records.
+"""
+import os
+import struct
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from splitallcsv import csv_files, locations_dir
+
+MAGIC = b'WODLOCS\0'
+VERSION = 1
+HEADER_SIZE = 64
+# magic, version, record_count, pixel_count, string_count, records/pixels/strings offsets
+HEADER_FORMAT = '<8sHIIIIII'
+
+RECORD_DTYPE = np.dtype([
+    ('locationID', '<u8'),
+    ('gisX', '<f4'),
+    ('gisY', '<f4'),
+    ('worldX', '<u2'),
+    ('worldY', '<u2'),
+    ('name', '<u2'),
+    ('prefab', '<u2'),
+    ('terrainX', '<u2'),
+    ('terrainY', '<u2'),
+    ('type', 'u1'),
+    ('reserved', 'u1', (3,)),
+])
+PIXEL_DTYPE = np.dtype([('key', '<u4'), ('start', '<u4'), ('count', '<u4')])
+
+def pixel_key(worldX, worldY):
+    return (np.asarray(worldY, dtype=np.uint32) << 16) | np.asarray(worldX, dtype=np.uint32)
+
+def string_table(strings):
+    """Offsets (len + 1 uint32) and UTF-8 blob of a list of strings."""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.concatenate([[0], np.cumsum([len(e) for e in encoded])]).astype('<u4')
+    return offsets, b''.join(encoded)
+
+def packed_ints(values, column):
+    """Integer column values, refusing any that its record field can't hold instead of wrapping them."""
+    values = values.fillna(0).astype(np.int64).to_numpy()
+    info = np.iinfo(RECORD_DTYPE[column])
+    outside = (values < info.min) | (values > info.max)
+    if outside.any():
+        raise ValueError(f"{outside.sum()} {column} values outside {info.min}..{info.max}, "
+                         f"e.g. {values[outside][0]}; they don't fit the region file")
+    return values
+
+def encode_region(group):
+    """Records, pixel index and string table for one region's rows."""
+    names = group['name'].fillna('').astype(str)
+    prefabs = group['prefab'].fillna('').astype(str)
+    strings = sorted(set(names) | set(prefabs))
+    if len(strings) > np.iinfo(RECORD_DTYPE['name']).max:
+        raise ValueError(f"Too many distinct names and prefabs for one region file: {len(strings)}")
+    lookup = {s: i for i, s in enumerate(strings)}
+
+    records = np.zeros(len(group), dtype=RECORD_DTYPE)
+    records['locationID'] = group['locationID'].fillna(0).astype(np.uint64)
+    records['gisX'] = group['gisX'].fillna(0)
+    records['gisY'] = group['gisY'].fillna(0)
+    for column in ["type", "worldX", "worldY", "terrainX", "terrainY"]:
+        records[column] = packed_ints(group[column], column)
+    records['name'] = names.map(lookup)
+    records['prefab'] = prefabs.map(lookup)
+    records = records[np.lexsort((records['locationID'], records['worldX'], records['worldY']))]
+
+    keys = pixel_key(records['worldX'], records['worldY'])
+    unique_keys, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    pixels = np.zeros(len(unique_keys), dtype=PIXEL_DTYPE)
+    pixels['key'] = unique_keys
+    pixels['start'] = starts
+    pixels['count'] = counts
+    return records, pixels, strings
+
+def write_region_bin(path, records, pixels, strings):
+    offsets, blob = string_table(strings)
+    records_offset = HEADER_SIZE
+    pixels_offset = records_offset + records.nbytes
+    strings_offset = pixels_offset + pixels.nbytes
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, len(records), len(pixels), len(strings),
+                         records_offset, pixels_offset, strings_offset)
+    with open(path, 'wb') as file:
+        file.write(header.ljust(HEADER_SIZE, b'\0'))
+        file.write(records.tobytes())
+        file.write(pixels.tobytes())
+        file.write(offsets.tobytes())
+        file.write(blob)
+
+def read_region_bin(path):
+    """Memory-map a region file; returns a dict with records, pixels and strings."""
+    with open(path, 'rb') as file:
+        header = file.read(HEADER_SIZE)
+    magic, version, record_count, pixel_count, string_count, records_offset, pixels_offset, strings_offset = \
+        struct.unpack_from(HEADER_FORMAT, header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} location file")
+    blob_offset = strings_offset + 4 * (string_count + 1)
+    # Check the sections against the header before viewing them, so a bad file raises instead of misreading
+    size = os.path.getsize(path)
+    records_size, pixels_size = pixels_offset - records_offset, strings_offset - pixels_offset
+    if records_size != record_count * RECORD_DTYPE.itemsize or pixels_size != pixel_count * PIXEL_DTYPE.itemsize \
+            or blob_offset > size:
+        raise ValueError(f"{path} is truncated or corrupt: header says {record_count} records, {pixel_count} pixels "
+                         f"and {string_count} strings, sections hold {records_size} and {pixels_size} bytes "
+                         f"of a {size} byte file")
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    records = data[records_offset:pixels_offset].view(RECORD_DTYPE)
+    pixels = data[pixels_offset:strings_offset].view(PIXEL_DTYPE)
+    offsets = data[strings_offset:blob_offset].view('<u4')
+    blob = data[blob_offset:].tobytes()
+    if len(blob) != offsets[-1]:
+        raise ValueError(f"{path} is truncated or corrupt: string table holds {offsets[-1]} bytes, found {len(blob)}")
+    strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(string_count)]
+    return {'records': records, 'pixels': pixels, 'strings': strings}
+
+def records_at(region, worldX, worldY):
+    """Records at one map pixel, found by binary search of the pixel index."""
+    pixels = region['pixels']
+    key = pixel_key(worldX, worldY)
+    i = np.searchsorted(pixels['key'], key)
+    if i == len(pixels) or pixels['key'][i] != key:
+        return region['records'][:0]
+    start = pixels['start'][i]
+    return region['records'][start:start + pixels['count'][i]]
+
+# Function to partition a CSV file into binary region files
+def partition_bin(file_name, locations_dir=locations_dir):
+    file_path = Path(file_name)
+    locations_dir = Path(locations_dir)
+    # Check if the CSV file exists
+    if not file_path.is_file():
+        print(f"File {file_name} not found. Skipping...")
+        return
+
+    df = pd.read_csv(file_path)
+    locations_dir.mkdir(exist_ok=True)
+
+    for region, group in df.groupby('region'):
+        # Directory names keep spaces
+        region_dir = locations_dir / region
+        region_dir.mkdir(parents=True, exist_ok=True)
+
+        # Filenames have spaces removed
+        sanitized_region_name = region.replace(" ", "")
+        partitioned_file_path = region_dir / f"{sanitized_region_name}_{file_path.stem}.bin"
+
+        # Check if the partitioned file already exists
+        if partitioned_file_path.is_file():
+            print(f"File {partitioned_file_path} already exists. Skipping...")
+            continue
+
+        write_region_bin(partitioned_file_path, *encode_region(group))
+        print(f"Partitioned file created: {partitioned_file_path} ({os.path.getsize(partitioned_file_path)} bytes)")
+
+if __name__ == "__main__":
+    # Partition each CSV file if it exists and hasn't been processed yet
+    for file in csv_files:
+        partition_bin(file)
@@ -9,7 +9,6 @@ csv_files = [
 
 # Directory to store the partitioned files
 locations_dir = Path("Locations")
-locations_dir.mkdir(exist_ok=True)
 
 # Define the columns to be included in the partitioned files
 columns_to_include = [
@@ -21,14 +20,16 @@ columns_to_include = [
 columns_to_convert = ["type", "worldX", "worldY", "terrainX", "terrainY"]
 
 # Function to partition a CSV file
-def partition_csv(file_name):
+def partition_csv(file_name, locations_dir=locations_dir):
     file_path = Path(file_name)
+    locations_dir = Path(locations_dir)
     # Check if the CSV file exists
     if not file_path.is_file():
         print(f"File {file_name} not found. Skipping...")
         return
     
     df = pd.read_csv(file_path)
+    locations_dir.mkdir(exist_ok=True)
     
     for region, group in df.groupby('region'):
         # Convert specified fields to integers then to strings to remove trailing .0s
@@ -56,7 +57,8 @@ def partition_csv(file_name):
         group_filtered.to_csv(partitioned_file_path, index=False)
         print(f"Partitioned file created: {partitioned_file_path}")
 
-# Partition each CSV file if it exists and hasn't been processed yet
-for file in csv_files:
-    partition_csv(file)
+if __name__ == "__main__":
+    # Partition each CSV file if it exists and hasn't been processed yet
+    for file in csv_files:
+        partition_csv(file)
 
@@ -0,0 +1,101 @@
+"""
+Invariant checks over a pipeline output.
+
+Every check is one vectorized pass over the whole locations table and returns
+a boolean mask of the rows that break it, so a full world validates in well
+under a second and the check can gate every export:
+
+    duplicate_id       locationID appears more than once
+    outside_map        worldX/worldY outside the map
+    terrain_range      terrainX/terrainY outside 0 .. terrain_size - 1
+    missing_prefab     empty prefab, or missing / non-positive sizeX or sizeY
+    footprint_outside  the sizeX x sizeY footprint sticks out of the terrain tile
+    on_road_track      the footprint touches a road or track segment of its pixel
+    water_center       the sub-cell under terrainX/terrainY is water on the water map
+
+Rows that fail outside_map or terrain_range are skipped by the raster checks.
+"""
+import numpy as np
+import pandas as pd
+from path_geometry import footprint_crosses_paths
+from path_grid import LAYERS
+from water_checks import centers_in_water
+from world_spec import check_grid_shape
+
+DEFAULT_LOCATIONS_FILE = 'updated_locations_off_roads_tracks.csv'
+COLUMNS = ['locationID', 'prefab', 'worldX', 'worldY', 'terrainX', 'terrainY', 'sizeX', 'sizeY']
+CHECKS = ['duplicate_id', 'outside_map', 'terrain_range', 'missing_prefab', 'footprint_outside',
+          'on_road_track', 'water_center']
+
+def read_locations(csv_filename):
+    """The columns the checks use; missing ones come back as all-NaN."""
+    df = pd.read_csv(csv_filename, usecols=lambda column: column in COLUMNS)
+    for column in COLUMNS:
+        if column not in df.columns:
+            df[column] = np.nan
+    return df
+
+def check_locations(df, paths, water_map, spec):
+    """
+    {check name: boolean mask of failing rows} for every check in CHECKS. The
+    water check is the generator's own test (centers_in_water in water_checks.py).
+    """
+    size = spec['terrain_size']
+    world_x, world_y = df['worldX'].to_numpy(dtype=np.float64), df['worldY'].to_numpy(dtype=np.float64)
+    terrain_x, terrain_y = df['terrainX'].to_numpy(dtype=np.float64), df['terrainY'].to_numpy(dtype=np.float64)
+    size_x, size_y = df['sizeX'].to_numpy(dtype=np.float64), df['sizeY'].to_numpy(dtype=np.float64)
+    # NaN compares False everywhere, so a missing coordinate fails the range checks
+    inside_map = (world_x >= 0) & (world_x < spec['width']) & (world_y >= 0) & (world_y < spec['height'])
+    in_terrain = (terrain_x >= 0) & (terrain_x < size) & (terrain_y >= 0) & (terrain_y < size)
+    has_size = (size_x > 0) & (size_y > 0)
+    prefab = df['prefab'].fillna('').astype(str).str.strip()
+
+    failures = {
+        'duplicate_id': df['locationID'].duplicated(keep=False).to_numpy(),
+        'outside_map': ~inside_map,
+        'terrain_range': ~in_terrain,
+        'missing_prefab': (prefab == '').to_numpy() | ~has_size,
+        'footprint_outside': has_size & ((terrain_x - size_x / 2 < 0) | (terrain_x + size_x / 2 > size)
+                                         | (terrain_y - size_y / 2 < 0) | (terrain_y + size_y / 2 > size)),
+    }
+
+    # Raster lookups only for rows that point at a real map pixel and terrain position
+    rows = np.flatnonzero(inside_map & in_terrain)
+    xs, ys = world_x[rows].astype(np.int64), world_y[rows].astype(np.int64)
+    on_road_track = np.zeros(len(df), dtype=bool)
+    sized = has_size[rows]
+    bits = paths[ys, xs, LAYERS.index('road')] | paths[ys, xs, LAYERS.index('track')]
+    on_road_track[rows[sized]] = footprint_crosses_paths(bits[sized], terrain_x[rows][sized], terrain_y[rows][sized],
+                                                         size_x[rows][sized], size_y[rows][sized],
+                                                         tile_center=spec['tile_center'])
+    failures['on_road_track'] = on_road_track
+
+    water_center = np.zeros(len(df), dtype=bool)
+    water_center[rows] = centers_in_water(xs, ys, terrain_x[rows].astype(np.int64), terrain_y[rows].astype(np.int64),
+                                          water_map, spec)
+    failures['water_center'] = water_center
+    return failures
+
+def validate_locations(csv_filename=DEFAULT_LOCATIONS_FILE, path_grid_filename='paths.grid',
+                       water_map_filename='DFWaterMap.png', spec=None):
+    """Read an output and its world inputs and return (locations, failures) (see check_locations)."""
+    from world_assets import load_world_assets
+    from world_spec import load_world_spec
+    spec = spec or load_world_spec()
+    assets = load_world_assets(['paths', 'water'], {'paths': path_grid_filename, 'water': water_map_filename},
+                               spec=spec)
+    check_grid_shape(spec, assets['paths'].shape, "The path grid")
+    df = read_locations(csv_filename)
+    return df, check_locations(df, assets['paths'], assets['water'], spec)
+
+def report(df, failures, examples=5):
+    """Printable failure counts per check, with a few example locationIDs each."""
+    lines = [f"{len(df)} locations"]
+    for check in CHECKS:
+        failed = failures[check]
+        line = f"{check}: {failed.sum()}"
+        if failed.any() and examples:
+            ids = df['locationID'][failed].head(examples).tolist()
+            line += f" (e.g. {', '.join(str(i) for i in ids)})"
+        lines.append(line)
+    return '\n'.join(lines)
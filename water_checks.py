@@ -0,0 +1,57 @@
+"""
+Water tests for location centers, on the water map and the river/stream layers.
+
+Shared by generate-locations.py (rejecting candidate centers) and validate.py
+(checking an output), so both apply exactly the same test.
+"""
+import numpy as np
+from path_geometry import footprint_crosses_paths
+from path_grid import LAYERS
+from world_spec import DEFAULT_WORLD_SPEC, terrain_subcells
+
+def is_center_water_pixel(cell_x, cell_y, water_map, spec=DEFAULT_WORLD_SPEC):
+    """Works on single cells or on whole arrays of cell coordinates at once."""
+    # The scaling factors are determined by the ratio of the water map size to the game map size (in cells)
+    scale_x = water_map.shape[1] / spec['cell_width']  # water map width / game map width in cells
+    scale_y = water_map.shape[0] / spec['cell_height']  # water map height / game map height in cells
+
+    # Calculate the corresponding top-left pixel of the cell block on the water map
+    water_x = (np.asarray(cell_x) * scale_x).astype(np.int64)
+    water_y = (np.asarray(cell_y) * scale_y).astype(np.int64)
+
+    # Determine the center of the cell block on the water map
+    center_x = water_x + int(scale_x / 2)
+    center_y = water_y + int(scale_y / 2)
+
+    # Assuming the water is represented by black in RGBA
+    black_color = (0, 0, 0, 255)
+    pixel_color = water_map[center_y, center_x]
+
+    return (pixel_color == black_color).all(axis=-1)
+
+def centers_in_water(xs, ys, terrainXs, terrainYs, water_map, spec=DEFAULT_WORLD_SPEC):
+    """True where the sub-cell under each (worldX, worldY, terrainX, terrainY) center is water."""
+    # Convert terrain coordinates to sub-cell coordinates on the whole map for the water map check
+    cell_x = (xs * spec['subcells']) + terrain_subcells(spec, terrainXs)
+    cell_y = (ys * spec['subcells']) + terrain_subcells(spec, terrainYs)
+    return is_center_water_pixel(cell_x, cell_y, water_map, spec)
+
+def water_path_bits(paths):
+    """(height, width) river and stream bits of a layered path grid, OR-ed together."""
+    return paths[..., LAYERS.index('river')] | paths[..., LAYERS.index('stream')]
+
+def water_path_footprint(location_names_filename='location_names.csv'):
+    """
+    (sizeX, sizeY) in terrain units covering every prefab in the location names
+    CSV. The prefab isn't chosen yet when a center is generated, so a center is
+    only kept if the largest one would clear the rivers and streams there.
+    """
+    import pandas as pd
+    sizes = pd.read_csv(location_names_filename, usecols=['sizeX', 'sizeY'])
+    return float(sizes['sizeX'].max()), float(sizes['sizeY'].max())
+
+def crosses_water_paths(water_paths, xs, ys, terrainXs, terrainYs, footprint, spec=DEFAULT_WORLD_SPEC):
+    """True where a `footprint` ((sizeX, sizeY), see water_path_footprint) centered there crosses a river or stream."""
+    sizeX, sizeY = np.full(len(xs), footprint[0]), np.full(len(xs), footprint[1])
+    return footprint_crosses_paths(water_paths[ys, xs], terrainXs, terrainYs, sizeX, sizeY,
+                                   tile_center=spec['tile_center'])
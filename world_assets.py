@@ -0,0 +1,92 @@
+"""
+Shared loader for the world input files used by the pipeline stages.
+
+Every stage used to read its inputs one after another before doing any work.
+The loaders below are submitted to a thread pool instead, so file I/O and PNG
+decoding (both of which release the GIL) overlap and start-up costs roughly
+the slowest single load rather than the sum of all of them.
+
+Rasters are returned as read-only NumPy arrays indexed [worldY, worldX] (the
+path layers as a read-only memory map), so stages can share them without
+copying and without stepping on each other. Every loader gets the world spec
+(see world_spec.py) so grids compiled from CSVs and polygons match its size.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+# Default file for every asset, relative to the working directory
+ASSET_FILES = {
+    'paths': 'paths.grid',
+    'dflocations': 'DFLocations.csv',
+    'water': 'DFWaterMap.png',
+    'heatmap': 'DFPopHeatMap.png',
+    'climate': 'DFClimateMap.png',
+    'regions': 'Regions.gpkg',
+    'region_raster': 'Regions.gpkg',
+    'locations': 'updated_locations_off_roads_tracks.csv',
+}
+
+def read_only(array):
+    """Mark a NumPy array as immutable and return it."""
+    array.flags.writeable = False
+    return array
+
+def load_paths(filename, spec):
+    """Memory-map the layered road/track/river/stream grid (see path_grid.py)."""
+    from path_grid import load_path_grid
+    return load_path_grid(filename, width=spec['width'])
+
+def load_image_array(filename, spec):
+    """Decode a map image into a (height, width, 4) RGBA uint8 array."""
+    import numpy as np
+    from PIL import Image
+    with Image.open(filename) as image:
+        return read_only(np.array(image.convert('RGBA')))
+
+def load_dflocations(filename, spec):
+    """Load the compiled DFLocations index (see df_index.py) with read-only arrays."""
+    from df_index import load_dflocation_index
+    index = load_dflocation_index(filename, spec['width'], spec['height'])
+    return {key: read_only(value) for key, value in index.items()}
+
+def load_regions(filename, spec):
+    """Load the region polygons as a GeoDataFrame."""
+    import geopandas as gpd
+    return gpd.read_file(filename)
+
+def load_region_grid(filename, spec):
+    """Load the per-pixel region codes rasterized from the region polygons (see region_raster.py)."""
+    from region_raster import load_region_raster
+    raster = load_region_raster(filename, spec['width'], spec['height'])
+    return {key: read_only(value) for key, value in raster.items()}
+
+def load_locations(filename, spec):
+    """Load the per-pixel index over a generated locations CSV (see location_index.py)."""
+    from location_index import load_location_index
+    index = load_location_index(filename, spec['width'], spec['height'], terrain_size=spec['terrain_size'])
+    return {key: read_only(value) for key, value in index.items()}
+
+ASSET_LOADERS = {
+    'paths': load_paths,
+    'dflocations': load_dflocations,
+    'water': load_image_array,
+    'heatmap': load_image_array,
+    'climate': load_image_array,
+    'regions': load_regions,
+    'region_raster': load_region_grid,
+    'locations': load_locations,
+}
+
+def load_world_assets(names, filenames=None, max_workers=None, spec=None):
+    """
+    Load the named assets concurrently and return them keyed by name.
+    `filenames` overrides entries of ASSET_FILES for this call only; `spec`
+    defaults to load_world_spec().
+    """
+    from world_spec import load_world_spec
+    spec = spec or load_world_spec()
+    files = dict(ASSET_FILES)
+    files.update(filenames or {})
+    with ThreadPoolExecutor(max_workers=max_workers or len(names)) as executor:
+        futures = {name: executor.submit(ASSET_LOADERS[name], files[name], spec) for name in names}
+        # result() re-raises any loader error in the calling thread
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,102 @@
+"""
+Dimensions of the world every stage works on.
+
+A world spec is a plain dict built by make_world_spec from four numbers: the
+map size in pixels, the number of sub-cells per map pixel side and the terrain
+tile size. Everything derived from them (sub-cell centre offsets, the cell grid
+the water map is sampled on, which sub-cells lie on a road or track segment)
+is computed here once instead of being hardcoded in each stage.
+
+The defaults are the Daggerfall map: 1000x500 pixels of 128x128 terrain with
+3x3 sub-cells centred at 21, 64 and 107. A different world is described by a
+JSON file holding any of the four numbers, e.g. {"subcells": 5}, passed to
+`pipeline.py --world-spec` (or world_spec.json in the working directory).
+"""
+import json
+import os
+import numpy as np
+from path_geometry import DIRECTIONS, DIRECTION_BITS, DIRECTION_STEPS
+
+DEFAULT_SPEC_FILE = 'world_spec.json'
+SPEC_KEYS = ['width', 'height', 'subcells', 'terrain_size']
+
+def subcell_path_bits(subcells):
+    """
+    Path bits that put a road/track center in each sub-cell, indexed [iy, ix]
+    with iy growing to the north: a sub-cell gets the bit of every direction
+    whose segment passes through its centre, and the centre sub-cell gets all
+    bits since any path crosses it.
+    """
+    center = subcells // 2
+    bits = np.zeros((subcells, subcells), dtype=np.uint8)
+    for iy in range(subcells):
+        for ix in range(subcells):
+            dx, dy = ix - center, iy - center
+            for bit, (sx, sy) in zip(DIRECTION_BITS, DIRECTION_STEPS.astype(int)):
+                if (dx, dy) == (0, 0) or any((dx, dy) == (k * sx, k * sy) for k in range(1, center + 1)):
+                    bits[iy, ix] |= bit
+    return bits
+
+def subcell_directions(coords):
+    """
+    {(terrainX, terrainY): direction} for every non-centre sub-cell a path
+    direction passes through, e.g. (64, 107): 'N' with 3x3 sub-cells.
+    """
+    center = len(coords) // 2
+    lookup = {}
+    for direction, (dx, dy) in zip(DIRECTIONS, DIRECTION_STEPS.astype(int)):
+        for k in range(1, center + 1):
+            lookup[(int(coords[center + k * dx]), int(coords[center + k * dy]))] = direction
+    return lookup
+
+def make_world_spec(width=1000, height=500, subcells=3, terrain_size=128):
+    """World spec dict with the derived sizes and offsets."""
+    if subcells % 2 != 1 or subcells < 1:
+        raise ValueError(f"subcells must be odd so every map pixel has a centre sub-cell, got {subcells}")
+    if terrain_size % 2 != 0 or terrain_size < subcells:
+        raise ValueError(f"terrain_size must be even and at least subcells, got {terrain_size}")
+    coords = np.rint((np.arange(subcells) + 0.5) * terrain_size / subcells).astype(np.int64)
+    return {
+        'width': width,
+        'height': height,
+        'subcells': subcells,
+        'terrain_size': terrain_size,
+        # Terrain coordinate of the centre of each sub-cell (0 .. subcells - 1)
+        'subcell_coords': coords,
+        'center_subcell': subcells // 2,
+        'tile_center': terrain_size // 2,
+        # Terrain units per sub-cell when mapping a terrain coordinate back to its sub-cell
+        'subcell_size': terrain_size // subcells,
+        # The sub-cell grid the water map is sampled on
+        'cell_width': width * subcells,
+        'cell_height': height * subcells,
+        'subcell_path_bits': subcell_path_bits(subcells),
+        'subcell_directions': subcell_directions(coords),
+    }
+
+DEFAULT_WORLD_SPEC = make_world_spec()
+
+def load_world_spec(filename=None):
+    """
+    World spec from a JSON file; without a filename, from world_spec.json if it
+    exists, otherwise the default Daggerfall world.
+    """
+    if filename is None:
+        if not os.path.exists(DEFAULT_SPEC_FILE):
+            return DEFAULT_WORLD_SPEC
+        filename = DEFAULT_SPEC_FILE
+    with open(filename) as file:
+        values = json.load(file)
+    unknown = set(values) - set(SPEC_KEYS)
+    if unknown:
+        raise ValueError(f"{filename}: unknown world spec keys {sorted(unknown)}, expected some of {SPEC_KEYS}")
+    return make_world_spec(**values)
+
+def check_grid_shape(spec, shape, what):
+    """Raise if a (height, width, ...) grid doesn't match the world spec."""
+    if tuple(shape[:2]) != (spec['height'], spec['width']):
+        raise ValueError(f"{what} is {shape[1]}x{shape[0]} but the world spec is {spec['width']}x{spec['height']}")
+
+def terrain_subcells(spec, terrain):
+    """Sub-cell index (0 .. subcells - 1) of terrain coordinates."""
+    return np.minimum(np.asarray(terrain) // spec['subcell_size'], spec['subcells'] - 1)